@@ -0,0 +1,493 @@
+'''Asynchronous client for the Clash of Clans API.
+
+All requests share one `aiohttp.ClientSession` with a bounded keep-alive connection pool,
+so handlers and pollers can `await` API responses without blocking the event loop.
+Successful responses are kept in an endpoint-aware TTL cache, requests to the network
+go through a global token-bucket rate limiter, where chat commands are served before pollings.
+Concurrent requests to the same endpoint share one network request.
+Requests are spread across the pool of API tokens, throttled tokens are taken out of rotation for a while.
+
+Classes:
+
+    ResponseCache
+    RateLimiter
+    ApiToken
+    TokenPool
+    CoCApiClient
+
+Objects:
+
+    api_client - shared `CoCApiClient` instance used by `handle_clan_data.request_to_api`
+'''
+
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import aiohttp
+
+from bot_config import API_TOKENS, ApiTokenDispatch, ApiTokenCooldown
+from bot_config import ApiConnectionsLimit, ApiKeepAliveTimeout, ApiRequestTimeout
+from bot_config import ApiCacheTTL, ApiCacheMaxBytes
+from bot_config import ApiRequestsPerSecond, ApiRequestsBurst
+
+from type_hintings import Response, RequestPriority
+
+
+class ResponseCache:
+    '''LRU cache of successful API responses keyed by endpoint path.
+
+    Entry lifetime is taken from the `max-age` of the `Cache-Control` response header, when the API sends it,
+    otherwise from the TTL of the endpoint family. Endpoints of the families without TTL aren't cached.
+
+    :parameter `ttl_by_family`: seconds to keep responses of each endpoint family, see `ENDPOINT_FAMILIES`
+    :parameter `max_bytes`: upper limit for the summary size of the cached response bodies'''
+
+    ENDPOINT_FAMILIES = (
+                         ('clanwarleagues/wars', re.compile(r'^clanwarleagues/wars/')),
+                         ('leaguegroup', re.compile(r'^clans/[^/]+/currentwar/leaguegroup$')),
+                         ('currentwar', re.compile(r'^clans/[^/]+/currentwar$')),
+                         ('members', re.compile(r'^clans/[^/]+/members$')),
+                         ('players', re.compile(r'^players/[^/]+$')),
+                         ('capitalraidseasons', re.compile(r'^clans/[^/]+/capitalraidseasons(\?.*)?$')),
+                        )
+    MAX_AGE = re.compile(r'max-age=(\d+)')
+
+    def __init__(self, ttl_by_family: dict, max_bytes: int):
+        self.ttl_by_family = ttl_by_family
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, int, Response]] = OrderedDict()
+
+
+    def _define_family(self, api_req: str) -> str | None:
+        '''Returns name of the endpoint family, which api endpoint belongs to.'''
+
+        for family, pattern in self.ENDPOINT_FAMILIES:
+            if pattern.match(api_req):
+                return family
+        return None
+
+
+    def _define_ttl(self, api_req: str, cache_control: str | None) -> float:
+        '''Returns number of seconds to keep response of the api endpoint in cache.'''
+
+        family_ttl = self.ttl_by_family.get(self._define_family(api_req))
+        if not family_ttl:
+            return 0
+
+        if cache_control:
+            if 'no-cache' in cache_control or 'no-store' in cache_control:
+                return 0
+
+            max_age = self.MAX_AGE.search(cache_control)
+            if max_age:
+                return int(max_age.group(1))
+
+        return family_ttl
+
+
+    def get(self, api_req: str) -> Response | None:
+        '''Returns cached response of the api endpoint if it isn't expired, else None.'''
+
+        entry = self._entries.get(api_req)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                self._remove(api_req)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(api_req)
+        self.hits += 1
+        return entry[2]
+
+
+    def put(self, api_req: str, response: Response, size_bytes: int, cache_control: str | None = None):
+        '''Saves successful response of the api endpoint, evicts least recently used responses while the cache exceeds `max_bytes`.'''
+
+        ttl = self._define_ttl(api_req, cache_control)
+        if response.status_code != 200 or ttl <= 0 or size_bytes > self.max_bytes:
+            return
+
+        if api_req in self._entries:
+            self._remove(api_req)
+
+        self._entries[api_req] = (time.monotonic() + ttl, size_bytes, response)
+        self.size_bytes += size_bytes
+        while self.size_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+
+    def invalidate(self, api_req: str):
+        '''Removes response of the api endpoint from cache.'''
+
+        if api_req in self._entries:
+            self._remove(api_req)
+
+
+    def _remove(self, api_req: str):
+        _, size_bytes, _ = self._entries.pop(api_req)
+        self.size_bytes -= size_bytes
+
+
+class RateLimiter:
+    '''Token bucket shared by all requests to the API.
+
+    Requests, that can't get a token immediately, wait in the queue ordered by `RequestPriority` and arrival order,
+    so chat commands jump ahead of the polling requests. Queued request can be moved to a higher priority lane by `promote()`.
+
+    :parameter `rate`: number of tokens added to the bucket per second
+    :parameter `burst`: capacity of the bucket'''
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._waiters: list[tuple[int, int, asyncio.Future, str | None]] = []
+        self._arrival_order = itertools.count()
+        self._wakeup: asyncio.TimerHandle | None = None
+
+        self.acquired = {priority: 0 for priority in RequestPriority}
+        self.wait_seconds_total = {priority: 0.0 for priority in RequestPriority}
+        self.max_wait_seconds = {priority: 0.0 for priority in RequestPriority}
+
+
+    @property
+    def queued(self) -> int:
+        '''Number of requests waiting for a token.'''
+
+        return sum(1 for _, _, waiter, _ in self._waiters if not waiter.done())
+
+
+    def average_wait_seconds(self, priority: RequestPriority) -> float:
+        '''Returns average time spent in the queue by requests of the priority lane.'''
+
+        if not self.acquired[priority]:
+            return 0.0
+        return self.wait_seconds_total[priority] / self.acquired[priority]
+
+
+    async def acquire(self, priority: RequestPriority = RequestPriority.interactive, key: str | None = None):
+        '''Waits until a token is available for the request of the given priority and takes it.
+
+        :parameter `key`: identifies the queued request for `promote()`'''
+
+        started_at = time.monotonic()
+        self._refill()
+
+        if not self._waiters and self._tokens >= 1:
+            self._tokens -= 1
+
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority.value, next(self._arrival_order), waiter, key))
+            self._schedule_wakeup()
+            await waiter
+
+        waited = time.monotonic() - started_at
+        self.acquired[priority] += 1
+        self.wait_seconds_total[priority] += waited
+        self.max_wait_seconds[priority] = max(self.max_wait_seconds[priority], waited)
+
+
+    def promote(self, key: str, priority: RequestPriority):
+        '''Moves the queued request of the key into the lane of `priority`, if it waits in a lower priority lane.'''
+
+        for index, (waiter_priority, arrival_order, waiter, waiter_key) in enumerate(self._waiters):
+            if waiter_key == key and not waiter.done() and priority.value < waiter_priority:
+                self._waiters[index] = (priority.value, arrival_order, waiter, waiter_key)
+                heapq.heapify(self._waiters)
+                return
+
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+
+    def _schedule_wakeup(self):
+        '''Plans releasing of the waiters to the moment, when the next token appears in the bucket.'''
+
+        if self._wakeup is None and self._waiters:
+            delay = max(0.0, (1 - self._tokens) / self.rate)
+            self._wakeup = asyncio.get_running_loop().call_later(delay, self._release_waiters)
+
+
+    def _release_waiters(self):
+        '''Hands out available tokens to the waiters in the order of priority.'''
+
+        self._wakeup = None
+        self._refill()
+        while self._waiters and self._tokens >= 1:
+            _, _, waiter, _ = heapq.heappop(self._waiters)
+            if waiter.done(): #waiter was cancelled while stood in the queue
+                continue
+            self._tokens -= 1
+            waiter.set_result(None)
+
+        self._schedule_wakeup()
+
+
+class ApiToken:
+    '''API token of the pool with its usage statistics.
+
+    :parameter `value`: CoC developer API token'''
+
+    def __init__(self, value: str):
+        self.value = value
+        self.requests = 0
+        self.in_flight = 0
+        self.throttled = 0
+        self.cooldown_until = 0.0
+
+
+    def __repr__(self):
+        return f'ApiToken(...{self.value[-6:]})' #the token itself mustn't get into logs
+
+
+class TokenPool:
+    '''Spreads requests across several API tokens, because the API throttles each token separately.
+
+    After the API answered 429 to the request, or 403 about the token itself (invalid key or not allowed IP),
+    its token is taken out of rotation for `cooldown` seconds. Other 403 (e.g. private war log of the clan) are returned to the caller.
+
+    :parameter `tokens`: CoC developer API tokens
+    :parameter `dispatch`: `'least_loaded'` picks the token with the fewest requests in flight, `'round_robin'` takes tokens in turn
+    :parameter `cooldown`: seconds to keep the throttled token out of rotation'''
+
+    THROTTLED_STATUS_CODE = 429
+    TOKEN_ERROR_REASONS = ('accessDenied.invalidIp',)
+    TOKEN_ERROR_MESSAGES = ('Invalid authorization',) #403 `accessDenied` is also returned for private war logs, only its message tells them apart
+
+    def __init__(self, tokens: list[str], dispatch: str, cooldown: float):
+        if dispatch not in ('least_loaded', 'round_robin'):
+            raise ValueError(f'Unknown API tokens dispatch: {dispatch}')
+
+        self.tokens = [ApiToken(token) for token in tokens]
+        self.dispatch = dispatch
+        self.cooldown = cooldown
+        self._round_robin = itertools.cycle(self.tokens)
+
+
+    def __len__(self):
+        return len(self.tokens)
+
+
+    def available_tokens(self) -> list[ApiToken]:
+        '''Returns tokens, that aren't in cooldown now.'''
+
+        now = time.monotonic()
+        return [token for token in self.tokens if token.cooldown_until <= now]
+
+
+    def stats(self) -> dict[str, dict]:
+        '''Returns usage statistics of each token.'''
+
+        now = time.monotonic()
+        return {repr(token): {'requests' : token.requests,
+                              'in_flight' : token.in_flight,
+                              'throttled' : token.throttled,
+                              'cooldown_left' : max(0.0, token.cooldown_until - now)} for token in self.tokens}
+
+
+    async def acquire(self) -> ApiToken:
+        '''Returns token for the next request, waits for the end of the cooldown if all tokens are throttled.'''
+
+        available_tokens = self.available_tokens()
+        while not available_tokens:
+            await asyncio.sleep(min(token.cooldown_until for token in self.tokens) - time.monotonic())
+            available_tokens = self.available_tokens()
+
+        match self.dispatch:
+
+            case 'least_loaded':
+                token = min(available_tokens, key = lambda token: (token.in_flight, token.requests))
+
+            case 'round_robin':
+                token = next(self._round_robin)
+                while token not in available_tokens:
+                    token = next(self._round_robin)
+
+        token.in_flight += 1
+        token.requests += 1
+        return token
+
+
+    @classmethod
+    def is_throttled(cls, response: Response | None) -> bool:
+        '''Returns True if the API rejected the request because of its token: throttling or 403 about the key or IP.'''
+
+        if response is None:
+            return False
+
+        match response.status_code:
+
+            case cls.THROTTLED_STATUS_CODE:
+                return True
+
+            case 403:
+                error = response.json_api_response_info if isinstance(response.json_api_response_info, dict) else {}
+                return (error.get('reason') in cls.TOKEN_ERROR_REASONS
+                        or any(message in str(error.get('message', '')) for message in cls.TOKEN_ERROR_MESSAGES))
+
+            case _:
+                return False
+
+
+    def release(self, token: ApiToken, response: Response | None):
+        '''Returns token to the pool after the request, starts its cooldown if the API throttled it.'''
+
+        token.in_flight -= 1
+        if self.is_throttled(response):
+            token.throttled += 1
+            token.cooldown_until = time.monotonic() + self.cooldown
+            logging.warning(f'{token} got status code {response.status_code}, it is out of rotation for {self.cooldown} seconds')
+
+
+class CoCApiClient:
+    '''Sends GET requests to the CoC API through one shared `aiohttp.ClientSession`.
+
+    The session is created lazily inside the running event loop and lives until `close()` is awaited.
+
+    :parameter `token_pool`: `TokenPool` with CoC developer API tokens
+    :parameter `connections_limit`: max number of simultaneously opened connections to the API
+    :parameter `keepalive_timeout`: seconds to keep an idle connection opened for reuse
+    :parameter `request_timeout`: total timeout in seconds for a single request
+    :parameter `cache`: `ResponseCache` for successful responses
+    :parameter `rate_limiter`: `RateLimiter` for requests to the network'''
+
+    api_endpoint = 'https://api.clashofclans.com/v1/'
+
+    def __init__(self, token_pool: TokenPool, connections_limit: int, keepalive_timeout: float, request_timeout: float,
+                 cache: ResponseCache, rate_limiter: RateLimiter):
+        self.token_pool = token_pool
+        self.connections_limit = connections_limit
+        self.keepalive_timeout = keepalive_timeout
+        self.request_timeout = request_timeout
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.coalesced = 0
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._in_flight_priority: dict[str, RequestPriority] = {} #the highest priority among the callers of each request in flight
+        self._session: aiohttp.ClientSession | None = None
+
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        '''Returns shared session, creates it on the first call or after `close()`.'''
+
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit = self.connections_limit,
+                                             keepalive_timeout = self.keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector = connector,
+                                                  timeout = aiohttp.ClientTimeout(total = self.request_timeout),
+                                                  headers = {'Accept': 'application/json'})
+        return self._session
+
+
+    async def request(self, api_req: str, priority: RequestPriority = RequestPriority.interactive) -> Response:
+        '''Takes an api endpoint and priority lane of the request, returns response status code and a json result.
+
+        Returns cached response if there is a fresh one for this endpoint. If the same endpoint is already requested
+        by another caller, waits for its response instead of sending a new request; the shared request is raised
+        to the priority lane of the caller, if it's higher.
+        Raises `aiohttp.ClientError` on connection problems and `asyncio.TimeoutError` when the request exceeds `request_timeout`.'''
+
+        cached_response = self.cache.get(api_req)
+        if cached_response is not None:
+            return cached_response
+
+        in_flight = self._in_flight.get(api_req)
+        if in_flight is not None:
+            self.coalesced += 1
+            if priority.value < self._in_flight_priority[api_req].value:
+                self._in_flight_priority[api_req] = priority
+                self.rate_limiter.promote(api_req, priority)
+
+        else:
+            self._in_flight_priority[api_req] = priority
+            in_flight = asyncio.ensure_future(self._fetch(api_req))
+            self._in_flight[api_req] = in_flight
+            in_flight.add_done_callback(lambda done: self._forget_in_flight(api_req, done))
+
+        return await asyncio.shield(in_flight) #cancellation of one caller mustn't cancel the request shared with others
+
+
+    def _forget_in_flight(self, api_req: str, done: asyncio.Future):
+        '''Removes the finished request from requests in flight, unless a newer request of the endpoint took its place.'''
+
+        if self._in_flight.get(api_req) is done:
+            del self._in_flight[api_req]
+            del self._in_flight_priority[api_req]
+
+
+    async def _fetch(self, api_req: str) -> Response:
+        '''Waits for a token from the rate limiter in the lane of the highest priority among the callers of the request,
+        sends request to the api endpoint and caches successful response.
+
+        If the API token got throttled, repeats request with another token of the pool while there are available ones.'''
+
+        for _ in range(len(self.token_pool)):
+            await self.rate_limiter.acquire(self._in_flight_priority[api_req], key = api_req)
+            api_response, body, cache_control = await self._send(api_req)
+
+            if not self.token_pool.is_throttled(api_response) or not self.token_pool.available_tokens():
+                break
+
+        self.cache.put(api_req, api_response, len(body), cache_control)
+        return api_response
+
+
+    async def _send(self, api_req: str) -> tuple[Response, bytes, str | None]:
+        '''Sends request to the api endpoint with a token from the pool, returns response, its raw body and `Cache-Control` header.'''
+
+        session = self._get_session()
+        token = await self.token_pool.acquire()
+        api_response = None
+        try:
+            headers = {'Authorization': 'Bearer ' + token.value}
+            async with session.get(self.api_endpoint + api_req, headers = headers) as response:
+                body = await response.read()
+                cache_control = response.headers.get('Cache-Control')
+                api_response = Response(response.status, json.loads(body))
+        finally:
+            self.token_pool.release(token, api_response)
+
+        logging.info(f"Request status code: {api_response.status_code} | {datetime.now()}")
+        return api_response, body, cache_control
+
+
+    def log_stats(self):
+        '''Logs counters of the cache, coalesced requests, waits in the rate limiter and usage of the tokens since the start.'''
+
+        limiter_waits = ', '.join(f'{priority.name} avg {self.rate_limiter.average_wait_seconds(priority):.3f}s '
+                                  f'max {self.rate_limiter.max_wait_seconds[priority]:.3f}s of {self.rate_limiter.acquired[priority]}'
+                                  for priority in RequestPriority)
+        logging.info(f'ApiClientStats: cache hits {self.cache.hits}, misses {self.cache.misses}, evictions {self.cache.evictions}, '
+                     f'size {self.cache.size_bytes} bytes | coalesced {self.coalesced} | '
+                     f'limiter {limiter_waits}, queued {self.rate_limiter.queued} | tokens {self.token_pool.stats()}')
+
+
+    async def close(self):
+        '''Closes shared session and all its keep-alive connections.'''
+
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            await asyncio.sleep(0) #lets aiohttp finish closing of the underlying transports
+
+
+api_client = CoCApiClient(TokenPool(API_TOKENS, ApiTokenDispatch, ApiTokenCooldown), ApiConnectionsLimit, ApiKeepAliveTimeout, ApiRequestTimeout,
+                          ResponseCache(ApiCacheTTL, ApiCacheMaxBytes),
+                          RateLimiter(ApiRequestsPerSecond, ApiRequestsBurst))
@@ -0,0 +1,100 @@
+'''Micro-benchmark of the per-query overhead of `database.py`.
+
+Compares the old way of statements execution (SQL rebuilt by each call, `USE CoC_Helper` before each statement,
+text protocol for writes) with the current one (cached SQL, database selected by the connection, prepared writes).
+
+Usage:
+
+    python bench_database.py            - building of the SQL only, doesn't need a DB
+    python bench_database.py --server   - also round trips to the DB of `database_engine` configured in `mysql_config.py`
+                                          (with the 'sqlite' engine it runs on a local file without any server)
+'''
+
+import re
+import sys
+import timeit
+
+from database import DataBaseManipulations, backend, check_initDB, _insert_statement, _select_statement
+from type_hintings import SelectQuery
+
+
+ITERATIONS = 10000
+SERVER_ITERATIONS = 500
+
+COLUMNS_VALUE = {'member_name' : 'name', 'member_tag' : '#TAG', 'member_role' : 'member', 'clan_tag' : '#CLAN'}
+QUERY = SelectQuery('clan_tag', 'Chats', 'WHERE chat_id = %s', ('-100',))
+
+
+def old_insert_statement(table: str, columns_value: dict, ignore: bool, expression: str = None) -> str:
+    columns = ', '.join(columns_value.keys())
+    placeholder = re.findall(r'%s', '%s'*len(columns_value))
+    SQL = f"INSERT {'IGNORE ' if ignore else ''}INTO {table}({columns}) VALUES({', '.join(placeholder)})"
+    if expression is not None:
+        SQL = f'{SQL} {expression}'
+    return SQL
+
+
+def old_select_statement(query: SelectQuery) -> str:
+    return f'SELECT {query.columns_name} FROM {query.table_name} {query.expression}'
+
+
+def report(title: str, old_seconds: float, new_seconds: float, iterations: int):
+    old_us = old_seconds / iterations * 1e6
+    new_us = new_seconds / iterations * 1e6
+    print(f'{title:<40} old {old_us:9.2f} us   new {new_us:9.2f} us   saved {old_us - new_us:9.2f} us per query')
+
+
+def bench_statements():
+    old = timeit.timeit(lambda: old_insert_statement('ClanMembers', COLUMNS_VALUE, True), number = ITERATIONS)
+    new = timeit.timeit(lambda: _insert_statement('ClanMembers', tuple(COLUMNS_VALUE.keys()), True, None), number = ITERATIONS)
+    report('building of INSERT', old, new, ITERATIONS)
+
+    old = timeit.timeit(lambda: old_select_statement(QUERY), number = ITERATIONS)
+    new = timeit.timeit(lambda: _select_statement(QUERY.columns_name, QUERY.table_name, QUERY.expression), number = ITERATIONS)
+    report('building of SELECT', old, new, ITERATIONS)
+
+
+def bench_server():
+    check_initDB()
+    db = DataBaseManipulations()
+    values = tuple(COLUMNS_VALUE.values())
+    use_database = backend.name == 'mysql' #SQLite has no databases to select
+
+    with backend.connection() as conn:
+        cursor = backend.cursor(conn)
+        cursor.execute('CREATE TEMPORARY TABLE bench_ClanMembers (member_tag varchar(12), member_name varchar(20), member_role varchar(10), '
+                       'clan_tag varchar(10), CONSTRAINT pk_bench_clanMembers UNIQUE (member_tag))')
+
+        def old_select():
+            if use_database:
+                cursor.execute('USE CoC_Helper')
+            cursor.execute(old_select_statement(QUERY), params = QUERY.expression_values)
+            cursor.fetchall()
+
+        def new_select():
+            db.select(QUERY, conn).fetchall()
+
+        report('SELECT round trips', timeit.timeit(old_select, number = SERVER_ITERATIONS),
+               timeit.timeit(new_select, number = SERVER_ITERATIONS), SERVER_ITERATIONS)
+
+        def old_insert():
+            if use_database:
+                cursor.execute('USE CoC_Helper')
+            cursor.execute(old_insert_statement('bench_ClanMembers', COLUMNS_VALUE, True), params = values)
+
+        SQL = _insert_statement('bench_ClanMembers', tuple(COLUMNS_VALUE.keys()), True, None)
+        def new_insert():
+            db.get_write_cursor(conn, SQL).execute(SQL, params = values)
+
+        report('INSERT IGNORE round trips', timeit.timeit(old_insert, number = SERVER_ITERATIONS),
+               timeit.timeit(new_insert, number = SERVER_ITERATIONS), SERVER_ITERATIONS)
+
+        cursor.execute('DROP TABLE bench_ClanMembers')
+        conn.rollback()
+        cursor.close()
+
+
+if __name__ == '__main__':
+    bench_statements()
+    if '--server' in sys.argv:
+        bench_server()
@@ -6,9 +6,47 @@ from aiogram.contrib.middlewares.logging import LoggingMiddleware
 
 BOT_TOKEN = 'BOT_TOKEN'
 API_TOKEN = 'API_TOKEN'
+API_TOKENS = [API_TOKEN] #all CoC API tokens, requests are spread across them
 DelayPollClanWarLeagueMemberlist = 600
 DelayPollClanWarMemberlistAndRadeStatistic = 600
+PollJitter = 0.1 #max random shift of the clan polling as a fraction of the polling interval
+PollIntervalsByWarState = { #seconds between pollings of the clan by its last seen CW/CWL state, the shortest one is used
+                           'preparation' : 120,
+                           'inWar' : 120,
+                           'warEnded' : 1800,
+                           'ended' : 1800,
+                           'notInWar' : 1800
+                          }
 ThrottlingDelay = 5
+ChatClanTagCacheSize = 10000 #max number of the chats, which clan tags are kept in memory for chat commands
+PermissionCacheSize = 10000 #max number of the chat members, which permissions are kept in memory
+AdminPermissionCacheTTL = 60 #seconds to trust the cached bot admin rights of the chat member
+ChatMemberStatusCacheTTL = 30 #seconds to trust the cached Telegram status of the chat member
+RefreshPermissionsFromChatMemberUpdates = True #receive `chat_member` updates and refresh cached permissions by them (the bot must be a chat admin)
+EndedWarsCacheSize = 1024 #max number of the ended CWL wars kept in memory, ended war never changes, so it has no TTL
+PollRadeConcurrency = 10 #max number of the clan members requested at the same time while polling rade statistic
+CWLRoundsConcurrency = 7 #max number of the CWL rounds, which skirmishes are requested at the same time by /lvk_results
+ProgressMessageEditInterval = 1 #min seconds between edits of the message, that shows progress of the long command
+
+ApiConnectionsLimit = 20 #max number of simultaneously opened connections to the CoC API
+ApiKeepAliveTimeout = 30 #seconds to keep an idle connection to the CoC API opened for reuse
+ApiRequestTimeout = 10 #total timeout of the single CoC API request in seconds
+
+ApiCacheTTL = { #seconds to keep successful responses of each CoC API endpoint family, families without TTL aren't cached
+               'currentwar' : 30,
+               'leaguegroup' : 60,
+               'members' : 120,
+               'players' : 300,
+               'clanwarleagues/wars' : 60,
+               'capitalraidseasons' : 300
+              }
+ApiCacheMaxBytes = 16 * 1024 * 1024 #upper limit for the summary size of the cached CoC API responses
+
+ApiRequestsPerSecond = 10 #budget of the requests to the CoC API shared by chat commands and pollings
+ApiRequestsBurst = 10 #number of requests to the CoC API, that can be sent at once after idle time
+
+ApiTokenDispatch = 'least_loaded' #'least_loaded' or 'round_robin' choice of the token from API_TOKENS for the next request
+ApiTokenCooldown = 60 #seconds to keep the token out of rotation after the CoC API answered 403 or 429 to it
 
 
 bot = Bot(BOT_TOKEN)
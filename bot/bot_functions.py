@@ -12,21 +12,32 @@ from aiogram.dispatcher.filters import AdminFilter, IsReplyFilter
 
 from bot_config import dp, bot
 from bot_config import ThrottlingDelay
+from caches import admin_permissions, chat_member_statuses
 from states import Authentification
 
 from handle_clan_data import ClanDataExtractions
 from handle_tg_user_data import ChatDBManipulations
-from database import DataBaseManipulations
+from database import AsyncDataBaseManipulations, chat_id_param
 from type_hintings import SelectQuery, Tables
 
 
 
 chat = ChatDBManipulations()
 clan = ClanDataExtractions()
+db = AsyncDataBaseManipulations()
 
 
 logging.basicConfig(level = logging.INFO)
 
+@dp.chat_member_handler(state = '*')
+async def refresh_member_permissions(update: types.ChatMemberUpdated):
+    '''Refreshes cached Telegram status of the chat member, when it changes in the chat.
+    Cached bot admin rights of the member are checked again by the next command.'''
+
+    chat_member_statuses.put(update.chat.id, update.new_chat_member.user.id, update.new_chat_member.status)
+    admin_permissions.invalidate(update.chat.id, update.new_chat_member.user.id)
+
+
 async def anti_flood(msg: types.Message, *args, **kwargs):
 
     
@@ -40,7 +51,7 @@ async def anti_flood(msg: types.Message, *args, **kwargs):
 async def get_clan_members(msg: types.Message):
 
 
-    clan_tag = clan.get_clan_tag(msg.chat.id)
+    clan_tag = await clan.get_clan_tag(msg.chat.id)
     caption = await clan.get_caption_memberlist(clan_tag)
     await msg.answer(caption, ParseMode.MARKDOWN_V2)
 
@@ -50,7 +61,7 @@ async def get_clan_members(msg: types.Message):
 async def get_cw_memberlist(msg: types.Message):
     
     
-    clan_tag = clan.get_clan_tag(msg.chat.id)
+    clan_tag = await clan.get_clan_tag(msg.chat.id)
     caption = await clan.get_caption_cw_memberlist(clan_tag)
     await msg.answer(caption, ParseMode.MARKDOWN_V2)
 
@@ -60,7 +71,7 @@ async def get_cw_memberlist(msg: types.Message):
 async def get_cwl_memberlist(msg: types.Message):
 
     
-    clan_tag = clan.get_clan_tag(msg.chat.id)
+    clan_tag = await clan.get_clan_tag(msg.chat.id)
     caption = await clan.get_caption_cwl_memberlist(clan_tag)
     await msg.answer(caption, ParseMode.MARKDOWN_V2)
 
@@ -70,7 +81,7 @@ async def get_cwl_memberlist(msg: types.Message):
 async def get_remaining_time_cw(msg: types.Message):
     
     
-    clan_tag = clan.get_clan_tag(msg.chat.id)
+    clan_tag = await clan.get_clan_tag(msg.chat.id)
     caption = await clan.get_cw_status(clan_tag)
     await msg.answer(caption, ParseMode.MARKDOWN_V2)
 
@@ -80,7 +91,7 @@ async def get_remaining_time_cw(msg: types.Message):
 async def get_current_cwl_status(msg: types.Message):
 
 
-    clan_tag = clan.get_clan_tag(msg.chat.id)
+    clan_tag = await clan.get_clan_tag(msg.chat.id)
     caption = await clan.get_cwl_status(clan_tag)
     await msg.answer(caption, ParseMode.MARKDOWN_V2)
 
@@ -90,16 +101,17 @@ async def get_current_cwl_status(msg: types.Message):
 async def get_cwl_results(msg: types.Message):
 
 
-    clan_tag = clan.get_clan_tag(msg.chat.id)
+    clan_tag = await clan.get_clan_tag(msg.chat.id)
     caption = await clan.get_cwl_results(clan_tag.replace('0', 'O'), msg.chat.id)
-    await msg.answer(caption, ParseMode.MARKDOWN_V2)
+    if caption is not None: #else results already replaced the progress message
+        await msg.answer(caption, ParseMode.MARKDOWN_V2)
 
 
 @dp.message_handler(commands = 'rade_statistic', state = Authentification.clan_tag_registered)
 @dp.throttled(anti_flood, rate = ThrottlingDelay)
 async def get_rade_statistic(msg: types.Message):
 
-    clan_tag = clan.get_clan_tag(msg.chat.id)
+    clan_tag = await clan.get_clan_tag(msg.chat.id)
     caption = await clan.get_caption_rade_statistic(clan_tag, msg.chat.id)
     await msg.answer(caption, ParseMode.MARKDOWN_V2)
 
@@ -108,9 +120,9 @@ async def get_rade_statistic(msg: types.Message):
 @dp.throttled(anti_flood, rate = ThrottlingDelay)
 async def set_new_admin(msg: types.Message):
 
-    if chat._is_member_admin(msg.from_user.id, msg.chat.id):
+    if await chat._is_member_admin(msg.from_user.id, msg.chat.id):
 
-        chat.set_new_admin(msg.reply_to_message.from_user.id, msg.reply_to_message.from_user.first_name, msg.chat.id)
+        await chat.set_new_admin(msg.reply_to_message.from_user.id, msg.reply_to_message.from_user.first_name, msg.chat.id)
         caption = text(bold(f"Користувач {msg.reply_to_message.from_user.first_name} стає адміністратором❗️"))
         await msg.answer(caption, ParseMode.MARKDOWN_V2)
     
@@ -124,9 +136,9 @@ async def set_new_admin(msg: types.Message):
 @dp.throttled(anti_flood, rate = ThrottlingDelay)
 async def remove_admin_role(msg: types.Message):
 
-    if chat._is_member_admin(msg.from_user.id, msg.chat.id):
+    if await chat._is_member_admin(msg.from_user.id, msg.chat.id):
 
-        chat.remove_admin(msg.reply_to_message.from_user.id, msg.chat.id)
+        await chat.remove_admin(msg.reply_to_message.from_user.id, msg.chat.id)
         caption = text(bold(f"Користувач {msg.reply_to_message.from_user.id} лишився прав адміністратора❗️"))
         await msg.answer(caption, ParseMode.MARKDOWN_V2)
 
@@ -144,7 +156,7 @@ async def mute_chat_member(msg: types.Message):
     user_msg = msg.text
     time_minute = re.search(r"\d*", user_msg[6:])
     if time_minute:
-        member_is_admin_flag = chat._is_member_admin(msg.from_user.id, msg.chat.id)
+        member_is_admin_flag = await chat._is_member_admin(msg.from_user.id, msg.chat.id)
 
         if member_is_admin_flag:
             try:
@@ -174,7 +186,7 @@ async def unmute_chat_member(msg: types.Message):
 
 
     try:
-        if chat._is_member_admin(msg.reply_to_message.from_user.id, msg.chat.id):
+        if await chat._is_member_admin(msg.reply_to_message.from_user.id, msg.chat.id):
             await bot.restrict_chat_member(msg.chat.id,
                                            msg.reply_to_message.from_user.id,
 
@@ -199,16 +211,16 @@ async def add_user_nickname(msg: types.Message):
 
     user_id = msg.reply_to_message.from_user.id
     chat_id = msg.chat.id
-    if chat._is_member_admin(user_id, chat_id):
+    if await chat._is_member_admin(user_id, chat_id):
         try:
             user_nickname = msg.text.split(' ')[1] #it can raise IndexError, when msg after command is empty
             if len(user_nickname) > 30:
                 caption = text(bold('Ім`я не повинно перевищувати кількість 30-ти символів ❗️'))
                 return await msg.answer(caption, ParseMode.MARKDOWN_V2)
 
-            DataBaseManipulations().insert(Tables.UsersNames.value,
-                                           {"user_id" : user_id, "chat_id" : chat_id, "user_nickname" : user_nickname},
-                                           expression = f"ON DUPLICATE KEY UPDATE user_nickname = VALUES(user_nickname)")
+            await db.insert(Tables.UsersNames.value,
+                            {"user_id" : user_id, "chat_id" : chat_id, "user_nickname" : user_nickname},
+                            expression = f"ON DUPLICATE KEY UPDATE user_nickname = VALUES(user_nickname)")
             await msg.answer(text(bold(f'Користувачу {msg.reply_to_message.from_user.id} встановлено локальний нікнейм {user_nickname} ❗️')), ParseMode.MARKDOWN_V2)
         
         except IndexError:
@@ -223,7 +235,8 @@ async def add_user_nickname(msg: types.Message):
 async def get_user_nickname(msg: types.Message):
     '''Returns user nickname from table "ChatUsers_nicknames" by answer on his message'''
 
-    user_nickname = DataBaseManipulations().fetch_one(SelectQuery('user_nickname', Tables.UsersNames.value, f'WHERE chat_id = {msg.chat.id} AND user_id = {msg.reply_to_message.from_user.id}'))
+    user_nickname = await db.fetch_one(SelectQuery('user_nickname', Tables.UsersNames.value, f'WHERE chat_id = %s AND user_id = %s',
+                                                    (chat_id_param(msg.chat.id), msg.reply_to_message.from_user.id)))
     match user_nickname:
 
         case tuple():
@@ -240,7 +253,7 @@ async def get_user_nickname(msg: types.Message):
 async def set_new_admin(msg: types.Message):
 
 
-    if chat._is_member_admin(msg.from_user.id, msg.chat.id):
+    if await chat._is_member_admin(msg.from_user.id, msg.chat.id):
         caption = text(bold('Для цієї команди є одна з умов: вона повинна бути відповіддю на повідомленя користувача.'))
         await msg.answer(caption, ParseMode.MARKDOWN_V2)
 
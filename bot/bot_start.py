@@ -3,10 +3,8 @@
 Initializes DB tables if it aren't created, registers clan in DB if it isn't registered.
 Provides instruction message for usage to user in chat.'''
 
-import asyncio
 import logging
 import re
-from threading import Event, Thread
 
 
 from aiogram import types
@@ -15,20 +13,22 @@ from aiogram.utils.markdown import text, bold
 from aiogram.types import ParseMode
 from aiogram.utils.exceptions import ChatNotFound
 
-from mysql.connector.errors import IntegrityError
-
-from database import DataBaseManipulations
-from database import check_initDB
+from database import AsyncDataBaseManipulations, chat_id_param
+from database import check_initDB, backend as db_backend, read_backend as db_read_backend, executor as db_executor
+from errors import DataBaseIntegrityError
 
 
+from api_client import api_client
+from caches import chat_clan_tags, admin_permissions
 from handle_clan_data import Polling
 from handle_clan_data import request_to_api
 from handle_tg_user_data import check_user_status
+from poll_scheduler import PollScheduler, clan_states
 
 from bot_config import dp, bot
-from bot_config import DelayPollClanWarMemberlistAndRadeStatistic
+from bot_config import DelayPollClanWarMemberlistAndRadeStatistic, PollJitter, RefreshPermissionsFromChatMemberUpdates
 
-from type_hintings import Response
+from type_hintings import Response, RequestPriority
 from type_hintings import SelectQuery, Tables
 from states import Authentification
 
@@ -36,7 +36,7 @@ import bot_functions
 
 logging.basicConfig(level=logging.INFO)
 
-db = DataBaseManipulations()
+db = AsyncDataBaseManipulations()
 
             
 @dp.message_handler(content_types = 'new_chat_members', state='*')
@@ -91,7 +91,7 @@ async def define_caption_by_user_status(chat_id: int, user_id: str) -> str:
     user_status = await check_user_status(chat_id, user_id)
     if user_status in ['creator', 'owner', 'administrator']:
 
-        clan_info = _find_chat_id_in_DB(chat_id)
+        clan_info = await _find_chat_id_in_DB(chat_id)
         caption_for_chat_type = await _handle_searching_result(clan_info)
 
 
@@ -101,12 +101,12 @@ async def define_caption_by_user_status(chat_id: int, user_id: str) -> str:
     return caption_for_chat_type
 
 
-def _find_chat_id_in_DB(chat_id: int) -> tuple | None:
+async def _find_chat_id_in_DB(chat_id: int) -> tuple | None:
     '''Takes chat id as a parameter, finds it and returns result.
     :parameter chat_id: `chat id` of the telegram chat'''
 
 
-    result = db.fetch_one(SelectQuery('chat_id, clan_tag', Tables.Chats.value, f"WHERE chat_id = %s", (chat_id, )))
+    result = await db.fetch_one(SelectQuery('chat_id, clan_tag', Tables.Chats.value, f"WHERE chat_id = %s", (chat_id_param(chat_id), )))
     return result
 
 
@@ -143,7 +143,7 @@ async def check_and_save_clanTag_in_DB(msg: types.Message):
 
     if clanTag:
 
-        if _is_clan_exists(clanTag.group()):
+        if await _is_clan_exists(clanTag.group()):
             return await _save_clan(msg.chat.id, clanTag.group(), msg)
                 
         else:
@@ -163,24 +163,25 @@ async def _save_clan(chat_id: int, clan_tag: str, msg: types.Message):
     :param clan_tag: clan tag"""
 
     try:
-        db.insert(f'Chats', {'chat_id' : chat_id, 'clan_tag' : clan_tag})
+        await db.insert(f'Chats', {'chat_id' : chat_id, 'clan_tag' : clan_tag})
+        chat_clan_tags.put(chat_id, clan_tag)
         await _fill_ChatAdmins_table()
         await Authentification.clan_tag_registered.set()
 
         caption = text(bold('Клан вдало зареєстрований 😌'),
                        bold('По кнопці знизу [ / ] можеш роздивитися мої команди 😌'), sep = '\n')
         return await msg.answer(caption, ParseMode.MARKDOWN_V2)
-    except IntegrityError:
+    except DataBaseIntegrityError:
         caption = text(bold('На жаль, данний клан зареєстрований у іншому чаті 😔'),
                        bold('Спробуйте ще раз, але з іншим тегом'), sep='\n')
         return await msg.answer(caption, ParseMode.MARKDOWN_V2)
 
 
-def _is_clan_exists(clan_tag: str) -> bool:
+async def _is_clan_exists(clan_tag: str) -> bool:
     '''Takes `clan tag`, makes a test request to api about clan with this clan tag.
     Returns True if request status code equalst to 200.'''
 
-    req = request_to_api(f'clans/%23{clan_tag[1:]}') #here is slice because symbol '#' in api link already parsed as '%23'
+    req = await request_to_api(f'clans/%23{clan_tag[1:]}') #here is slice because symbol '#' in api link already parsed as '%23'
 
     if req.status_code == 200:
         return True
@@ -192,7 +193,7 @@ async def _fill_ChatAdmins_table():
     '''Collects all chat ids from table, makes requests to Telegram Bot Api with this id to get list of chat administrators.
     Inserts chat creator ID and First Name into table ChatAdmins with current chat id.'''
 
-    chat_id_list = (x[0] for x in db.fetch_all(SelectQuery('chat_id', Tables.Chats.value)))
+    chat_id_list = (x[0] for x in await db.fetch_all(SelectQuery('chat_id', Tables.Chats.value)))
     try:
 
         for chat_id in chat_id_list:
@@ -202,7 +203,8 @@ async def _fill_ChatAdmins_table():
                 admin_info = list(admin)
 
                 if admin_info[1][1] == 'creator':
-                    db.insert('ChatAdmins', {'user_id' : admin_info[0][1]['id'], 'user_name' : admin_info[0][1]['first_name'], 'chat_id' : chat_id}, ignore = True)
+                    await db.insert(Tables.ChatAdmins.value, {'user_id' : admin_info[0][1]['id'], 'user_name' : admin_info[0][1]['first_name'], 'chat_id' : chat_id}, ignore = True)
+                    admin_permissions.invalidate(chat_id, admin_info[0][1]['id'])
     except ChatNotFound:
         logging.error('Table "Chats" is clear, so chat_id_list is empty.')
 
@@ -218,66 +220,61 @@ async def answer_when_clan_is_not_registered(msg: types.Message):
 
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-def db_preparing(polling_delay_seconds: int = 600):
+async def on_startup(dp):
     '''
-    Takes polling delay in seconds.
     Checks if database is initialized; otherwise initializes.
 
-    Calls func _fill_ChatAdmins_table().
-    
-    Creates new thread event and launches class `PollingThread` with
-    this event as a parameter and polling delay in seconds.
-    
-    :parameter `polling_delay_seconds`: delay for polling requests to CoC API in seconds.'''
-
-    check_initDB()
-    loop = asyncio.new_event_loop()
-    loop.run_until_complete(_fill_ChatAdmins_table())
-    stopFlag = Event()
-    thread = PollingThread(stopFlag, DelayPollClanWarMemberlistAndRadeStatistic)
-    thread.start()
+    Calls func _fill_ChatAdmins_table(), loads registered clans into `chat_clan_tags` cache.
 
-class PollingThread(Thread):
-    """Executes separate thread to send poll requests to API for clan memberlist and rade statistic every x seconds.
+    Starts `poll_scheduler` in the event loop of the dispatcher.'''
 
-    :parameter event: class threading.Event()
-    :parameter delay_sec: number of the seconds for delay"""
+    await db.run_sync(check_initDB)
+    await _fill_ChatAdmins_table()
+    await db.consume_rows(SelectQuery('chat_id, clan_tag', Tables.Chats.value), chat_clan_tags.load)
+    poll_scheduler.start()
 
-    def __init__(self, event: Event, delay_sec: int):
-        Thread.__init__(self)
-        self.stopped = event
-        self.delay_sec = delay_sec
 
-    def run(self):
-        while not self.stopped.wait(self.delay_sec):
-            _start_pollings()
-
-def _start_pollings():
-    '''Starts pollings.'''
+async def _poll_clan(clan_tag: str):
+    '''Polls CW/CWL states, clan memberlist and rade statistic of the clan.'''
 
     poll = Polling()
-    clan_tags = _get_clan_tags_from_db()
-    for clan_tag in clan_tags:
-
-        clan_members_response = request_to_api(f'clans/%23{clan_tag[1:]}/members')
-        logging.info('PollClanMemberlist')
-        asyncio.run(poll.poll_clan_memberlist(Response(
-                                                       clan_members_response.status_code,
-                                                       clan_members_response.json_api_response_info
-                                                       ),
-                                              clan_tag))
-        logging.info('PollClanRadeStatistic')
-        asyncio.run(poll.poll_rade_statistic(clan_members_response.json_api_response_info, clan_tag)) #REPLACE BECAUSE API HAS ALREADY PARSED SYMBOL '#' INTO THE LINK
-
-
-def _get_clan_tags_from_db() -> list:
+    await poll.poll_war_states(clan_tag)
+    clan_members_response = await request_to_api(f'clans/%23{clan_tag[1:]}/members', RequestPriority.background)
+    logging.info('PollClanMemberlist')
+    await poll.poll_clan_memberlist(Response(
+                                             clan_members_response.status_code,
+                                             clan_members_response.json_api_response_info
+                                             ),
+                                    clan_tag)
+    logging.info('PollClanRadeStatistic')
+    await poll.poll_rade_statistic(clan_members_response.json_api_response_info, clan_tag) #REPLACE BECAUSE API HAS ALREADY PARSED SYMBOL '#' INTO THE LINK
+
+
+async def _get_clan_tags_from_db() -> list:
         '''Extracts all clan tags from table `Chats`.
         
         Returns list of the registered clan tags.'''
 
-        clan_tags = [clan_tag[0] for clan_tag in DataBaseManipulations().fetch_all(SelectQuery('clan_tag', Tables.Chats.value))]
+        clan_tags = [clan_tag[0] for clan_tag in await db.fetch_all(SelectQuery('clan_tag', Tables.Chats.value))]
         return clan_tags
 
 
+poll_scheduler = PollScheduler(_poll_clan, _get_clan_tags_from_db, DelayPollClanWarMemberlistAndRadeStatistic, PollJitter, clan_states,
+                               on_refresh = api_client.log_stats)
+
+
+async def on_shutdown(dp):
+    '''Stops `poll_scheduler`, closes shared CoC API session, waits for the last DB operations and closes DB connections.'''
+
+    await poll_scheduler.stop()
+    await api_client.close()
+    db_executor.shutdown()
+    db_backend.close()
+    if db_read_backend is not db_backend:
+        db_read_backend.close()
+
+
 if __name__ == '__main__':
-    executor.start_polling(dp, skip_updates = True, on_startup = db_preparing(polling_delay_seconds = DelayPollClanWarMemberlistAndRadeStatistic))
+    #`chat_member` updates are sent only on demand; the bot handles only messages and them, so other updates aren't requested
+    allowed_updates = types.AllowedUpdates.MESSAGE + types.AllowedUpdates.CHAT_MEMBER if RefreshPermissionsFromChatMemberUpdates else None
+    executor.start_polling(dp, skip_updates = True, on_startup = on_startup, on_shutdown = on_shutdown, allowed_updates = allowed_updates)
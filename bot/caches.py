@@ -0,0 +1,243 @@
+'''In-process caches of the DB, Telegram and CoC API data, that is read by chat commands.
+
+Classes:
+
+    ChatClanTagCache
+    PermissionCache
+    EndedWarsCache
+    WarTimelineCache
+
+Objects:
+
+    chat_clan_tags - shared `ChatClanTagCache` instance, loaded by `bot_start.on_startup` and filled by `bot_start._save_clan`
+    admin_permissions - shared `PermissionCache` of the bot admin rights (table `ChatAdmins`) of the chat members
+    chat_member_statuses - shared `PermissionCache` of the Telegram statuses of the chat members
+    ended_wars - shared `EndedWarsCache` of the CoC API responses about ended CWL wars
+    war_timelines - shared `WarTimelineCache` of the current CW and CWL round of each clan, filled by polling and status commands
+'''
+
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Iterable
+
+from bot_config import ChatClanTagCacheSize
+from bot_config import PermissionCacheSize, AdminPermissionCacheTTL, ChatMemberStatusCacheTTL
+from bot_config import EndedWarsCacheSize
+from type_hintings import WarTimeline
+
+
+class ChatClanTagCache:
+    '''LRU map of the chat id to the tag of the clan registered in this chat.
+
+    Cache is only a shortcut of the table `Chats`: missed chat is looked up in the DB by the caller and put here.
+
+    :parameter `max_size`: max number of the cached chats, the least recently used one is evicted first'''
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._clan_tags: OrderedDict[str, str] = OrderedDict()
+
+
+    def __len__(self) -> int:
+        return len(self._clan_tags)
+
+
+    def get(self, chat_id: int | str) -> str | None:
+        '''Returns clan tag of the chat, or None if the chat isn't cached.'''
+
+        clan_tag = self._clan_tags.get(str(chat_id))
+        if clan_tag is None:
+            self.misses += 1
+            return None
+
+        self._clan_tags.move_to_end(str(chat_id))
+        self.hits += 1
+        return clan_tag
+
+
+    def put(self, chat_id: int | str, clan_tag: str):
+        '''Saves clan tag of the chat, evicts the least recently used chat if the cache is full.'''
+
+        self._clan_tags[str(chat_id)] = clan_tag #chat ids are stored as strings, like in the table `Chats`
+        self._clan_tags.move_to_end(str(chat_id))
+        while len(self._clan_tags) > self.max_size:
+            self._clan_tags.popitem(last = False)
+
+
+    def load(self, chats: Iterable[tuple]):
+        '''Takes rows (chat_id, clan_tag) of the table `Chats` (they can be streamed from the DB), replaces cached chats by them.'''
+
+        self._clan_tags.clear()
+        for chat_id, clan_tag in chats:
+            self.put(chat_id, clan_tag)
+
+
+    def invalidate(self, chat_id: int | str | None = None):
+        '''Forgets clan tag of the chat, or of all chats if `chat_id` isn't passed.'''
+
+        if chat_id is None:
+            self._clan_tags.clear()
+        else:
+            self._clan_tags.pop(str(chat_id), None)
+
+
+class PermissionCache:
+    '''LRU cache of the permissions of the chat members keyed by (chat id, user id), each entry expires after `ttl` seconds.
+
+    :parameter `ttl`: seconds to keep the permission of the member
+    :parameter `max_size`: max number of the cached members, the least recently used one is evicted first'''
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, int], tuple[float, Any]] = OrderedDict()
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def get(self, chat_id: int | str, user_id: int) -> Any | None:
+        '''Returns cached permission of the chat member if it isn't expired, else None.'''
+
+        key = (str(chat_id), int(user_id))
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+
+    def put(self, chat_id: int | str, user_id: int, permission: Any):
+        '''Saves permission of the chat member for `ttl` seconds, evicts the least recently used member if the cache is full.'''
+
+        key = (str(chat_id), int(user_id))
+        self._entries[key] = (time.monotonic() + self.ttl, permission)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last = False)
+
+
+    def invalidate(self, chat_id: int | str, user_id: int | None = None):
+        '''Forgets permission of the chat member, or of all members of the chat if `user_id` isn't passed.'''
+
+        if user_id is not None:
+            self._entries.pop((str(chat_id), int(user_id)), None)
+            return
+
+        for key in [key for key in self._entries if key[0] == str(chat_id)]:
+            del self._entries[key]
+
+
+class EndedWarsCache:
+    '''LRU cache of the CoC API responses about CWL wars by war tag.
+
+    Only ended wars are cached: their results never change, so they are kept without TTL until evicted by newer ones.
+
+    :parameter `max_size`: max number of the cached wars, the least recently used one is evicted first'''
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._wars: OrderedDict[str, dict] = OrderedDict()
+
+
+    def __len__(self) -> int:
+        return len(self._wars)
+
+
+    def get(self, war_tag: str) -> dict | None:
+        '''Returns cached war info, or None if the war isn't cached.'''
+
+        war_info = self._wars.get(war_tag)
+        if war_info is None:
+            self.misses += 1
+            return None
+
+        self._wars.move_to_end(war_tag)
+        self.hits += 1
+        return war_info
+
+
+    def put(self, war_tag: str, war_info: dict):
+        '''Saves war info, if the war is ended (`state` is `warEnded`).'''
+
+        if war_info.get('state') != 'warEnded':
+            return
+
+        self._wars[war_tag] = war_info
+        self._wars.move_to_end(war_tag)
+        while len(self._wars) > self.max_size:
+            self._wars.popitem(last = False)
+
+
+class WarTimelineCache:
+    '''Timelines of the current CW and of the current CWL round of each clan by clan tag.
+
+    Times of the war don't change once it's announced, so the timeline is kept until the moment, when it can become outdated
+    (`valid_until`, UTC): CW - until its end; CWL round - until its start, when the next round is announced, the last round - until its end.'''
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._wars: dict[str, WarTimeline] = {}
+        self._cwl_rounds: dict[str, tuple[datetime, int, WarTimeline]] = {}
+
+
+    def get_war(self, clan_tag: str) -> WarTimeline | None:
+        '''Returns timeline of the current CW of the clan, or None if it isn't cached or the war is over.'''
+
+        timeline = self._wars.get(clan_tag)
+        if timeline is None or timeline.end <= datetime.utcnow():
+            self._wars.pop(clan_tag, None)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return timeline
+
+
+    def put_war(self, clan_tag: str, timeline: WarTimeline | None):
+        '''Saves timeline of the current CW of the clan, forgets it if `timeline` is None (the clan isn't in war).'''
+
+        if timeline is None:
+            self._wars.pop(clan_tag, None)
+        else:
+            self._wars[clan_tag] = timeline
+
+
+    def get_cwl_round(self, clan_tag: str) -> tuple[int, WarTimeline] | None:
+        '''Returns index and timeline of the last announced CWL round of the clan, or None if it isn't cached or can be outdated.'''
+
+        cwl_round = self._cwl_rounds.get(clan_tag)
+        if cwl_round is None or cwl_round[0] <= datetime.utcnow():
+            self._cwl_rounds.pop(clan_tag, None)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return cwl_round[1:]
+
+
+    def put_cwl_round(self, clan_tag: str, round_index: int, timeline: WarTimeline, valid_until: datetime):
+        '''Saves index and timeline of the last announced CWL round of the clan until `valid_until`.'''
+
+        self._cwl_rounds[clan_tag] = (valid_until, round_index, timeline)
+
+
+chat_clan_tags = ChatClanTagCache(ChatClanTagCacheSize)
+admin_permissions = PermissionCache(AdminPermissionCacheTTL, PermissionCacheSize)
+chat_member_statuses = PermissionCache(ChatMemberStatusCacheTTL, PermissionCacheSize)
+ended_wars = EndedWarsCache(EndedWarsCacheSize)
+war_timelines = WarTimelineCache()
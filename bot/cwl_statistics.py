@@ -0,0 +1,47 @@
+'''In-memory aggregation of the CWL results of the clan members over skirmishes.
+
+Results of the skirmishes are summed per member while they are loaded, the totals are written
+into the table `ClanWarLeague_results` by one bulk upsert.
+
+Classes:
+
+    CWLSeasonStatistics'''
+
+
+RESULTS_COLUMNS = ('member_name', 'member_tag', 'stars', 'attacks', 'avg_score', 'destruction', 'avg_destruction',
+                   'three_stars', 'three_star_rate', 'clan_tag')
+
+
+class CWLSeasonStatistics:
+    '''Totals of the members results in the ended skirmishes played by the clan, keyed by member tag.
+
+    Each member of the skirmish has one attack in CWL: member without attack gets 0 stars and 0% of destruction.
+
+    :parameter `clan_tag`: tag of the clan, which skirmishes are added'''
+
+    def __init__(self, clan_tag: str):
+        self.clan_tag = clan_tag
+        self._totals: dict[str, list] = {} #member tag: [name, stars, attacks, three-star attacks, destruction]
+
+
+    def add_war(self, members: list[dict]):
+        '''Takes list of the clan members of the skirmish in json format, adds their results to the totals.'''
+
+        for member in members:
+            attack = member['attacks'][0] if member.get('attacks') else {}
+            stars = int(attack.get('stars', 0))
+            totals = self._totals.setdefault(member['tag'], [member['name'], 0, 0, 0, 0.0])
+            totals[0] = member['name'] #the latest name of the member
+            totals[1] += stars
+            totals[2] += 1
+            totals[3] += stars == 3
+            totals[4] += float(attack.get('destructionPercentage', 0))
+
+
+    def aggregate(self) -> list[tuple]:
+        '''Returns rows of the table `ClanWarLeague_results` in order of `RESULTS_COLUMNS`:
+        sums of stars, attacks, destruction and three-star attacks of each member with their averages per attack.'''
+
+        return [(name, tag, stars, attacks, round(stars / attacks, 3), round(destruction, 2), round(destruction / attacks, 2),
+                 three_stars, round(three_stars / attacks, 3), self.clan_tag)
+                for tag, (name, stars, attacks, three_stars, destruction) in self._totals.items()]
@@ -2,178 +2,374 @@
 
 Classes:
     DataBaseManilupations
-    Tables
-    SelectWhere
-    FetchAll
+    AsyncDataBaseManipulations
+Objects:
+    backend - shared `storage.StorageBackend` of the engine chosen by `database_engine` of `mysql_config.py`, the primary DB
+    read_backend - shared `storage.StorageBackend` of the read endpoint, the same as `backend` if the read endpoint isn't configured
+    executor - thread pool, where `AsyncDataBaseManipulations` runs DB operations
 Funcs:
-    _init_DB()
-    _Check_init_DB()"""
+    read_your_writes()
+    chat_id_param()
+    check_initDB()"""
 
 
+import asyncio
+import contextvars
+import functools
 import logging
-import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from typing import Any, Callable, Iterator
 
+from schema_migrations import apply_migrations
+from storage import StorageBackend, create_backend
 from type_hintings import SelectQuery
 
-from mysql.connector import connection, errors
-from mysql.connector.cursor import MySQLCursorBuffered
-
 
+from mysql_config import database_engine
 from mysql_config import mysql_config_host
 from mysql_config import mysql_config_user
 from mysql_config import mysql_config_port
 from mysql_config import mysql_config_password
 from mysql_config import mysql_config_charset
 from mysql_config import mysql_config_db_name
-
-
-conn = connection.MySQLConnection(
-                                  host = mysql_config_host,
-                                  port = mysql_config_port,
+from mysql_config import mysql_config_pool_size
+from mysql_config import mysql_config_pool_timeout
+from mysql_config import mysql_config_pool_health_check_after
+from mysql_config import mysql_config_statement_cache_size
+from mysql_config import mysql_config_prepared_statements
+from mysql_config import mysql_config_read_host
+from mysql_config import mysql_config_read_port
+from mysql_config import sqlite_config_path
+from mysql_config import sqlite_config_busy_timeout
+from mysql_config import sqlite_config_read_path
+
+
+def _create_configured_backend(read: bool = False) -> StorageBackend | None:
+    '''Returns backend of the engine chosen by `database_engine`, configured by `mysql_config.py`.
+
+    If `read` is True, returns backend of the read endpoint, or None if the read endpoint isn't configured.'''
+
+    match database_engine:
+
+        case 'sqlite':
+            path = sqlite_config_read_path if read else sqlite_config_path
+            if path is None:
+                return None
+            return create_backend('sqlite', path = path, busy_timeout = sqlite_config_busy_timeout)
+
+        case _:
+            host = mysql_config_read_host if read else mysql_config_host
+            if host is None:
+                return None
+            return create_backend(database_engine,
+                                  pool_size = mysql_config_pool_size,
+                                  pool_timeout = mysql_config_pool_timeout,
+                                  health_check_after = mysql_config_pool_health_check_after,
+                                  prepared_statements = mysql_config_prepared_statements,
+                                  host = host,
+                                  port = mysql_config_read_port if read and mysql_config_read_port is not None else mysql_config_port,
                                   user = mysql_config_user,
                                   password = mysql_config_password,
-                                  charset = mysql_config_charset
-                                )
+                                  charset = mysql_config_charset,
+                                  database = mysql_config_db_name
+                                 )
+
+
+backend = _create_configured_backend()
+read_backend = _create_configured_backend(read = True) or backend
+
+_reads_from_primary: contextvars.ContextVar[bool] = contextvars.ContextVar('reads_from_primary', default = False)
+
+
+@contextmanager
+def read_your_writes():
+    '''Routes reads of the `with` block (and of the coroutines and DB operations it awaits) to the primary DB,
+    so they see writes made just before, which may not be replicated to the read endpoint yet.'''
+
+    token = _reads_from_primary.set(True)
+    try:
+        yield
+    finally:
+        _reads_from_primary.reset(token)
+
+
+def chat_id_param(chat_id: int | str) -> str:
+    '''Returns chat id as a parameter of the query: column `chat_id` of the tables is varchar,
+    comparing it with a number would convert each row and disable the index of the column.'''
+
+    return str(chat_id)
+
+
+@functools.lru_cache(maxsize = mysql_config_statement_cache_size)
+def _select_statement(columns_name: str, table_name: str, expression: str | None) -> str:
+    '''Returns SQL of the select query, built once for each (columns, table, expression).'''
+
+    match expression:
+
+        case str():
+            return f'SELECT {columns_name} FROM {table_name} {expression}'
+
+        case None:
+            return f'SELECT {columns_name} FROM {table_name}'
+
+
+@functools.lru_cache(maxsize = mysql_config_statement_cache_size)
+def _insert_statement(table: str, columns: tuple, ignore: bool, expression: str | None, rows_count: int = 1) -> str:
+    '''Returns SQL of the insert of `rows_count` rows, built once for each (table, columns, mode, expression, rows count).
+
+    The same string object is returned for the same key, so prepared cursor recognizes already prepared statement by it.'''
 
+    row_placeholder = f"({', '.join(['%s'] * len(columns))})"
+    SQL = f"INSERT {'IGNORE ' if ignore else ''}INTO {table}({', '.join(columns)}) VALUES {', '.join([row_placeholder] * rows_count)}"
+    match expression:
 
-cursor = MySQLCursorBuffered(conn)
+        case str():
+            return f'{SQL} {expression}'
+
+        case None:
+            return SQL
 
 
 class DataBaseManipulations():
+    '''Executes queries of the bot on the storage backends.
+
+    Selects go to the read endpoint, writes and `connection()` go to the primary DB;
+    inside `read_your_writes()` selects go to the primary DB too.
+
+    :parameter `storage_backend`: `storage.StorageBackend` of the primary DB to use instead of the shared `backend`
+    :parameter `storage_read_backend`: `storage.StorageBackend` of the read endpoint to use instead of the shared `read_backend`,
+        if only `storage_backend` is passed, it serves reads too'''
+
+    def __init__(self, storage_backend: StorageBackend | None = None, storage_read_backend: StorageBackend | None = None):
+        self.backend = storage_backend if storage_backend is not None else backend
+        if storage_read_backend is not None:
+            self.read_backend = storage_read_backend
+        else:
+            self.read_backend = read_backend if storage_backend is None else storage_backend
+
+
+    def connection(self):
+        '''Returns context manager, that checks out connection of the primary DB for the `with` block.'''
+        return self.backend.connection()
+
+
+    def read_connection(self):
+        '''Returns context manager, that checks out connection of the read endpoint for the `with` block
+        (of the primary DB inside `read_your_writes()`).'''
+
+        return self._current_read_backend().connection()
+
 
+    def _current_read_backend(self) -> StorageBackend:
+        if _reads_from_primary.get():
+            return self.backend
+        return self.read_backend
 
-    def get_cursor(self):
-        '''Returns `MySQLCursorBuffered` with current `mysql.connector.connection.MySQLConnection()` as a parameter.'''
-        return MySQLCursorBuffered(conn)
 
+    def get_cursor(self, conn):
+        '''Returns buffered cursor of the checked out connection.
 
-    def get_connection(self):
-        '''Returns current mysql.connector.connection.MySQLConnection()'''
-        return conn
+        Database is selected once by the connection itself, so cursor doesn't send `USE` before each statement.'''
 
+        return self.backend.cursor(conn)
 
-    def select(self, query: SelectQuery):
-        '''Takes as a parameter `SelectQuery` class, executes select query and returns current cursor place.'''
 
-        cursor = self.get_cursor()
-        cursor.execute('USE CoC_Helper')
-        SQL_raw = f'SELECT {query.columns_name} FROM {query.table_name}'
+    def get_write_cursor(self, conn, statement: str):
+        '''Returns cursor of the checked out connection for the write statement
+        (prepared cursor of the pool for MySQL, if `mysql_config_prepared_statements` is on).'''
+
+        return self.backend.write_cursor(conn, statement)
+
+
+    def select(self, query: SelectQuery, conn):
+        '''Takes as a parameter `SelectQuery` class and checked out connection, executes select query and returns current cursor place.
+
+        Cursor is buffered, so its rows can be fetched after the connection is returned to the pool.'''
+
+        cursor = self.get_cursor(conn)
+        SQL = _select_statement(query.columns_name, query.table_name, query.expression)
         match query.expression:
 
             case str():
-                cursor.execute(f'{SQL_raw} {query.expression}', params = query.expression_values)
+                cursor.execute(SQL, params = query.expression_values)
 
             case None:
-                cursor.execute(SQL_raw) 
+                cursor.execute(SQL)
 
         return cursor
 
-    
+
     def fetch_one(self, select_query: SelectQuery) -> tuple | None:
         '''Takes as a parameter `SelectQuery' class, returns next row of a query result set'''
 
-        match select_query.expression:
-
-            case None:
-                return self.select(SelectQuery(select_query.columns_name,
-                                               select_query.table_name
-                                               )).fetchone()
+        with self.read_connection() as conn:
+            return self.select(select_query, conn).fetchone()
 
-            case _:
-                return self.select(SelectQuery(select_query.columns_name,
-                                               select_query.table_name,
-                                               select_query.expression,
-                                               select_query.expression_values
-                                               )).fetchone()        
 
     def fetch_all(self, select_query: SelectQuery) -> list:
         '''Takes as a parameter `SelectQuery` class, returns all rows of a query result set.
 
         :parameter `select_query`: class `SelectQuery`'''
 
-        match select_query.expression:
+        with self.read_connection() as conn:
+            return self.select(select_query, conn).fetchall()
+
+
+    def iter_rows(self, select_query: SelectQuery, batch_size: int = 500) -> Iterator[tuple]:
+        '''Takes as a parameter `SelectQuery` class, yields rows of a query result set one by one.
+
+        Rows are streamed from the DB by batches of `batch_size` rows, so only one batch is held in memory;
+        connection of the read endpoint stays checked out until the generator is exhausted or closed.'''
+
+        SQL = _select_statement(select_query.columns_name, select_query.table_name, select_query.expression)
+        storage_backend = self._current_read_backend()
+        with storage_backend.connection() as conn:
+            yield from storage_backend.iter_rows(conn, SQL, select_query.expression_values, batch_size)
 
-            case None:
-                return self.select(SelectQuery(select_query.columns_name,
-                                               select_query.table_name
-                                               )).fetchall()
-
-            case _: 
-                return self.select(SelectQuery(
-                                               select_query.columns_name,
-                                               select_query.table_name,
-                                               select_query.expression,
-                                               select_query.expression_values
-                                               )).fetchall()
 
     def insert(self, table: str, columns_value: dict, ignore: bool = False, expression: str = None):
         '''Takes table name, columns name and it values, bool value of mode `ignore`, expression as optional parameter;
         parses parameters into SQL query and executes it, confirms SQL connection commit, closes cursor.'''
-        
-        cursor = self.get_cursor()
-        columns = ', '.join(columns_value.keys())
-        values = tuple(columns_value.values())
-        placeholder = re.findall(r'%s', '%s'*len(values))
 
-        match ignore, expression:
+        SQL = _insert_statement(table, tuple(columns_value.keys()), ignore, expression)
+
+        with self.connection() as conn:
+            self.get_write_cursor(conn, SQL).execute(SQL, params = tuple(columns_value.values()))
+            conn.commit()
+
+
+    def insert_many(self, table: str, columns: tuple, rows: list[tuple], ignore: bool = False, expression: str = None,
+                    conn = None, batch_size: int = 500):
+        '''Takes table name, columns names, list of rows values, bool value of mode `ignore`, expression as optional parameter
+        (for example `ON DUPLICATE KEY UPDATE ...`); inserts rows by multi-row INSERT statements of `batch_size` rows each
+        (less, if the statement would exceed the placeholders limit of the backend).
+
+        Commits once for all rows; if connection of the opened `transaction()` is passed, leaves commit to the transaction.'''
+
+        if not rows:
+            return
+
+        batch_size = max(1, min(batch_size, self.backend.max_params // len(columns)))
+
+        with self._statement_connection(conn) as conn:
+            for batch_start in range(0, len(rows), batch_size):
+                batch = rows[batch_start:batch_start + batch_size]
+                SQL = _insert_statement(table, tuple(columns), ignore, expression, len(batch))
+                self.get_write_cursor(conn, SQL).execute(SQL, params = tuple(value for row in batch for value in row))
+
 
-            case True, None:
-                SQL = f"INSERT IGNORE INTO {table}({columns}) VALUES({', '.join(placeholder)})"
+    def delete(self, table_name: str, expressions: str, ignore: bool = False, conn = None, params: tuple | None = None):
+        '''Takes table name, expression, bool value of mode `ignore` and values of the `%s` placeholders of the expression;
+        parses parameters into SQL query and execute it, confirms SQL connection commit, closes cursor.
 
-            case True, str():
-                SQL = f"INSERT IGNORE INTO {table}({columns}) VALUES({', '.join(placeholder)}) {expression}"
+        If connection of the opened `transaction()` is passed, leaves commit to the transaction.'''
 
-            case False, None:
-                SQL = f"INSERT INTO {table}({columns}) VALUES({', '.join(placeholder)})"
 
-            case False, str():
-                SQL = f"INSERT INTO {table}({columns}) VALUES({', '.join(placeholder)}) {expression}"
+        with self._statement_connection(conn) as conn:
+            cursor = self.get_cursor(conn)
+            match ignore:
 
-        cursor.execute('USE CoC_Helper')
-        cursor.execute(SQL, params = values)
-        conn.commit()
-        cursor.close()
-        
+                case True:
+                    cursor.execute(f'DELETE IGNORE FROM {table_name} {expressions}', params)
 
-    def delete(self, table_name: str, expressions: str, ignore: bool = False):
-        '''Takes table name, expression, bool value of mode `ignore`;
-        parses parameters into SQL query and execute it, confirms SQL connection commit, closes cursor.'''
-        
+                case _:
 
-        cursor = self.get_cursor()
-        match ignore:
+                    cursor.execute(f'DELETE FROM {table_name} {expressions}', params)
+            cursor.close()
 
-            case True:
-                cursor.execute(f'DELETE IGNORE FROM {table_name} {expressions}')
 
-            case _:
+    @contextmanager
+    def transaction(self):
+        '''Checks out connection for the `with` block, commits all statements executed on it at once at the end
+        or rolls them back if the block raised an exception.'''
 
-                cursor.execute(f'DELETE FROM {table_name} {expressions}')
-        conn.commit()
-        cursor.close()
+        with self.connection() as conn:
+            yield conn
+            conn.commit()
 
 
-def _init_DB():
-    '''Executes mysql_create_tables.sql script, confirms SQL connection commit, closes cursor.'''
+    @contextmanager
+    def _statement_connection(self, conn):
+        '''Yields passed connection of the opened transaction, else opens own transaction for the statement.'''
 
-    with open('mysql_create_tables.sql', 'r') as script:
-        sql_script = script.read()
+        if conn is not None:
+            yield conn
 
-        
-        cursor = MySQLCursorBuffered(conn)  
-        results = cursor.execute(sql_script, multi = True)
+        else:
+            with self.transaction() as conn:
+                yield conn
 
-        for cur in results:
-            logging.info(f'{cur}')
 
-        conn.commit()
-        cursor.close()
+executor = ThreadPoolExecutor(max_workers = mysql_config_pool_size, thread_name_prefix = 'database')
+
+
+class AsyncDataBaseManipulations():
+    '''Async variant of `DataBaseManipulations` for coroutines.
+
+    Each operation runs in the thread pool `executor`, so the event loop only awaits it and keeps serving other chats meanwhile.'''
+
+    def __init__(self):
+        self.sync = DataBaseManipulations()
+
+
+    async def run_sync(self, func, *args, **kwargs):
+        '''Runs blocking function with DB operations in the thread pool `executor`, returns its result.
+
+        Function runs in a copy of the current context, so it sees `read_your_writes()` of the caller.'''
+
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(executor, functools.partial(context.run, func, *args, **kwargs))
+
+
+    async def fetch_one(self, select_query: SelectQuery) -> tuple | None:
+        '''Takes as a parameter `SelectQuery' class, returns next row of a query result set'''
+
+        return await self.run_sync(self.sync.fetch_one, select_query)
+
+
+    async def fetch_all(self, select_query: SelectQuery) -> list:
+        '''Takes as a parameter `SelectQuery` class, returns all rows of a query result set.'''
+
+        return await self.run_sync(self.sync.fetch_all, select_query)
+
+
+    async def consume_rows(self, select_query: SelectQuery, consumer: Callable[[Iterator[tuple]], Any], batch_size: int = 500) -> Any:
+        '''Takes as a parameters `SelectQuery` class and function, that takes iterator of rows;
+        passes rows of `DataBaseManipulations.iter_rows` to the function in the thread pool `executor`, returns its result.
+
+        Rows are consumed while they are streamed from the DB, the whole result set is never held in memory.
+        Rows stream is closed in the thread pool even if the function raises or stops early, so the connection is returned at once.'''
+
+        def consume():
+            with closing(self.sync.iter_rows(select_query, batch_size)) as rows:
+                return consumer(rows)
+
+        return await self.run_sync(consume)
+
+
+    async def insert(self, table: str, columns_value: dict, ignore: bool = False, expression: str = None):
+        '''Takes the same parameters as `DataBaseManipulations.insert` and executes it.'''
+
+        await self.run_sync(self.sync.insert, table, columns_value, ignore, expression)
+
+
+    async def insert_many(self, table: str, columns: tuple, rows: list[tuple], ignore: bool = False, expression: str = None):
+        '''Takes the same parameters as `DataBaseManipulations.insert_many` and executes it in one transaction.'''
+
+        await self.run_sync(self.sync.insert_many, table, columns, rows, ignore, expression)
+
+
+    async def delete(self, table_name: str, expressions: str, ignore: bool = False, params: tuple | None = None):
+        '''Takes the same parameters as `DataBaseManipulations.delete` and executes it.'''
+
+        await self.run_sync(self.sync.delete, table_name, expressions, ignore, params = params)
 
 
 def check_initDB():
-    '''Requests test SQL query to DB, initiate DB if raises exception ProgrammingError.'''
+    '''Creates the database by the backend if it doesn't exist, then applies pending schema migrations of the module `schema_migrations.py`.'''
 
-    try:
-        cursor.execute(f'SHOW TABLES FROM {mysql_config_db_name};')
-    except errors.ProgrammingError:
-        _init_DB()
+    backend.create_database()
+    for migration in apply_migrations(backend):
+        logging.info(f'Schema migration {migration.version:04d}_{migration.name} is applied')
@@ -7,4 +7,17 @@ class ClanWarEndedError(Exception):
     pass
 
 class ClanNotFoundError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class DataBaseError(Exception):
+    '''Error of the DB engine, raised by backends of the module `storage.py` instead of the driver errors.'''
+    pass
+
+class DataBaseIntegrityError(DataBaseError):
+    pass
+
+class DataBaseProgrammingError(DataBaseError):
+    pass
+
+class DataBaseOperationalError(DataBaseError):
+    pass
@@ -3,63 +3,56 @@
 Classes:
 
     Parsers
-    ClanDataExtractions(DataBaseManipulations, Parsers)
+    ClanDataExtractions(AsyncDataBaseManipulations, Parsers)
     Polling(ClanDataExtractions)
     Thread_PollClanWarLeagueMemberlist(Thread)
 
 Functions:
 
-    request_to_api(api_req: str) -> Response [class from module `type_hintings.py`]
+    async request_to_api(api_req: str, priority: RequestPriority) -> Response [class from module `type_hintings.py`]
 '''
 
 
-import requests
+import asyncio
 import logging
-from requests.exceptions import ConnectionError
-from typing import Generator
+import time
+from typing import Generator, Iterable
 from threading import enumerate as thread_enumerate
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from aiohttp import ClientError
 from aiogram.utils.markdown import text, bold
-from aiogram.types import ParseMode
-import mysql.connector.errors
-
-from bot_config import API_TOKEN, bot
-from database import DataBaseManipulations
-from errors import BadRequestError, ClanNotFoundError, ClanWarEndedError
-
-from type_hintings import Response, DateTime
-from type_hintings import ClanWarLeagueMembersInfo, ClanWarLeagueMembersAttacksResult
+from aiogram.types import ParseMode, Message
+from aiogram.utils.exceptions import MessageNotModified, TelegramAPIError
+
+from api_client import api_client
+from bot_config import bot, PollRadeConcurrency, CWLRoundsConcurrency, ProgressMessageEditInterval
+from caches import chat_clan_tags, ended_wars, war_timelines
+from cwl_statistics import CWLSeasonStatistics, RESULTS_COLUMNS
+from database import AsyncDataBaseManipulations, chat_id_param, read_your_writes
+from errors import BadRequestError, ClanNotFoundError, ClanWarEndedError, DataBaseError, DataBaseProgrammingError
+from poll_scheduler import clan_states
+
+from type_hintings import Response, RequestPriority, WarTimeline
+from type_hintings import ClanWarLeagueMembersInfo
 from type_hintings import ClanWarMembersInfo, ClanMembersInfo
 from type_hintings import SelectQuery, Tables
 
 
 logging.basicConfig(level = logging.INFO)
-def request_to_api(api_req: str) -> Response:
-    '''Takes an api endpoint, returns response status code and a json result.'''
-
-    api_endpoint = 'https://api.clashofclans.com/v1/'
-    headers = {
-        'Accept': "application/json",
-        'Authorization': "Bearer " + API_TOKEN
-    }
-    api_link = api_endpoint + api_req
-
-    request = requests.get(
-                            api_link,
-                            headers = headers
-                            )
-    status_code = request.status_code
-    json_api_response_json  = request.json()
-    logging.info(f"Request status code: {status_code} | {datetime.now()}")
-    return Response(status_code, json_api_response_json)
+async def request_to_api(api_req: str, priority: RequestPriority = RequestPriority.interactive) -> Response:
+    '''Takes an api endpoint and priority lane of the request, returns response status code and a json result.
+
+    Request is sent through the shared non-blocking `api_client.CoCApiClient` and its rate limiter.'''
+
+    return await api_client.request(api_req, priority)
 
 
 class Parsers: 
     '''Parses clan info from data set to message caption for user in chat.'''
 
-    def _parse_clan_memberlist_to_caption(self, members_info_db_response: list) -> str:
-        '''Takes DB response about memberlist info, return message caption.'''
+    def _parse_clan_memberlist_to_caption(self, members_info_db_response: Iterable[tuple]) -> str:
+        '''Takes DB response about memberlist info (rows are consumed lazily), return message caption or empty string if there are no rows.'''
 
         caption = ''
         for index, member_info in enumerate(members_info_db_response):
@@ -82,8 +75,8 @@ class Parsers:
 
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-    def _parse_cwl_memberlist_to_caption(self, members_info: list) -> str:
-        '''Takes DB response about cwl memberlist, returns message caption.'''
+    def _parse_cwl_memberlist_to_caption(self, members_info: Iterable[tuple]) -> str:
+        '''Takes DB response about cwl memberlist (rows are consumed lazily), returns message caption.'''
 
         caption = ''
         for index, member_info in enumerate(members_info):
@@ -95,55 +88,69 @@ class Parsers:
 
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
  
-    def _parse_cwl_results_to_caption(self, members_info: list):
-        '''Takes DB response about cwl clan results, returns message caption.'''
+    def _parse_cwl_results_to_caption(self, members_info: Iterable[tuple]):
+        '''Takes DB response about cwl clan results (rows are consumed lazily), returns message caption.'''
 
         caption = ''
         for index, member_info in enumerate(members_info):
             caption += text(bold(f'{index+1}.'),
-                            bold(f'👤: {member_info[0]}'), #indexes - it`s column number of the table ClanWarLeague_results
+                            bold(f'👤: {member_info[0]}'), #indexes - it`s column number of the select in `get_cwl_results`
                             bold(f"#️⃣: {member_info[1]}"),
                             bold(f"⭐️: {member_info[2]}"),
                             bold(f"⚔️: {member_info[3]}"),
-                            bold(f'AVG: {member_info[4]}\n\n'), sep = '\n')
+                            bold(f'AVG: {member_info[4]}'),
+                            bold(f'💥: {member_info[5]}%'),
+                            bold(f'🌟: {round(float(member_info[6]) * 100)}%\n\n'), sep = '\n')
 
         return caption
 
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
     
-    def _parse_rade_statistic_to_caption(self, members_info: list[str]) -> str:
-        '''Takes DB response about clan rade statistic, returns message caption.'''
+    def _parse_rade_statistic_to_caption(self, members_info: Iterable[tuple]) -> str:
+        '''Takes DB response about clan rade statistic (rows are consumed lazily), returns message caption or empty string if there are no rows.
+
+        Results of the last raid weekend and lifetime capital achievements are shown, if they were polled for the member.'''
 
         caption = ''
         for index, member_info in enumerate(members_info):
-            caption += text(bold(f"{index+1}."),
-                            bold(f"👤 {member_info[0]}"),
-                            bold(f"Накопичені 🪙: {member_info[1]}"),
-                            bold(f"Пожертвувані 🪙: {member_info[2]}"),
-                            bold(f"Збережені 🪙: {member_info[3]}\n\n"), sep = '\n')
+            lines = [bold(f"{index+1}."), bold(f"👤 {member_info[0]}")]
+            if member_info[4] is not None: #indexes - it`s column number of the select in `get_caption_rade_statistic`
+                lines += [bold(f"Награбовані за рейд 🪙: {member_info[4]}"),
+                          bold(f"Атаки ⚔️: {member_info[5]}/{member_info[6]}")]
+            if member_info[1] is not None:
+                lines += [bold(f"Накопичені 🪙: {member_info[1]}"),
+                          bold(f"Пожертвувані 🪙: {member_info[2]}"),
+                          bold(f"Збережені 🪙: {member_info[3]}")]
+            caption += text(*lines, sep = '\n') + '\n\n'
         return caption
 
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
     
-    def _parse_datetime(self, unparsed_datetime: str) -> DateTime:
-        '''Takes incorrect ISO datetime format, separates by year, month, day, hour, minute, data; returns formatted look in typehinting Datetime class.'''
+    @staticmethod
+    def _parse_api_datetime(api_datetime: str) -> datetime:
+        '''Takes datetime of the API in the format `YYYYMMDDTHHMMSS.000Z`, returns it as UTC datetime.
 
-        year = unparsed_datetime[:4]
-        month = unparsed_datetime[4:6]
-        day = unparsed_datetime[6:8]
-        hour = unparsed_datetime[9:11]
-        minute = unparsed_datetime[11:13]
-        seconds = unparsed_datetime[13:15]
+        Fields are taken by their fixed positions, without `datetime.strptime`.'''
 
-        return DateTime(year, month, day,
-                        hour, minute, seconds)
+        return datetime(int(api_datetime[:4]), int(api_datetime[4:6]), int(api_datetime[6:8]),
+                        int(api_datetime[9:11]), int(api_datetime[11:13]), int(api_datetime[13:15]))
 
 
-class ClanDataExtractions(DataBaseManipulations, Parsers):
+    def _parse_war_timeline(self, war_info: dict) -> WarTimeline:
+        '''Takes CW or CWL skirmish info in json format, returns its schedule in typehinting class `WarTimeline`.'''
+
+        return WarTimeline(self._parse_api_datetime(war_info['preparationStartTime']),
+                           self._parse_api_datetime(war_info['startTime']),
+                           self._parse_api_datetime(war_info['endTime']))
+
+
+class ClanDataExtractions(AsyncDataBaseManipulations, Parsers):
     '''Processes api response about clan info and parses it to message caption for user in chat.
     
     It will be good, if at the start you get acquainted with look of the API response.'''
 
+    _cwl_loading_locks: dict[str, asyncio.Lock] = {} #CWL results of each clan are loaded by one command at a time (shared by all instances)
+
     @staticmethod
     def _is_cwl_ended(cwl_state: dict) -> bool:
         '''Takes cwl state, returns True if it is ended.'''
@@ -157,32 +164,56 @@ class ClanDataExtractions(DataBaseManipulations, Parsers):
                 return False
 
 
-    def get_clan_tag(self, chat_id: int) -> str:
-        '''Takes chat id of current chat and returns relative clan tag to this chat.'''
+    async def get_clan_tag(self, chat_id: int) -> str:
+        '''Takes chat id of current chat and returns relative clan tag to this chat.
 
-        clan_tag = self.fetch_one(SelectQuery('clan_tag', Tables.Chats.value, f'WHERE chat_id = %s', (chat_id,)))
-        return clan_tag[0] #object of NoneType isn`t subscriptable, but keep in mind, that we can`t start use the program, while user is not registered
+        Clan tag is taken from `chat_clan_tags` cache, the DB is requested only if the chat isn't cached.'''
+
+        cached_clan_tag = chat_clan_tags.get(chat_id)
+        if cached_clan_tag is not None:
+            return cached_clan_tag
+
+        clan_tag = await self.fetch_one(SelectQuery('clan_tag', Tables.Chats.value, f'WHERE chat_id = %s', (chat_id_param(chat_id),)))
+        chat_clan_tags.put(chat_id, clan_tag[0]) #object of NoneType isn`t subscriptable, but keep in mind, that we can`t start use the program, while user is not registered
+        return clan_tag[0]
     
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
     async def get_cw_status(self, clan_tag: str) -> str:
-        '''Takes clan tag, returns current formatted status of CW to message caption.'''
+        '''Takes clan tag, returns current formatted status of CW to message caption.
 
-        cw_info = request_to_api(f'clans/%23{clan_tag[1:]}/currentwar').json_api_response_info
-        current_utc_time = str(datetime.utcnow()).split('.')[0] #.split() BECAUSE WE NEED TO GET RID OF MICROSECONDS
-        match cw_info['state']:
+        Timeline of the war is taken from `war_timelines` cache, the API is requested only if the clan has no cached war;
+        status is computed by the local clock.'''
 
-            case 'inWar':
-                end_time = self._get_state_endtime('endTime', cw_info, current_utc_time)
-                caption = text(bold('⏰ Час до кінця бою: ', end_time))
+        timeline = war_timelines.get_war(clan_tag)
+        if timeline is None:
+            cw_info = (await request_to_api(f'clans/%23{clan_tag[1:]}/currentwar')).json_api_response_info
+            clan_states.observe_war(clan_tag, cw_info.get('state'))
+            timeline = self._save_war_timeline(clan_tag, cw_info)
 
-            case 'preparation':
-                end_time = self._get_state_endtime('startTime', cw_info, current_utc_time)
-                caption = text(bold('⏰ Час до закінчення підготовки: ', end_time))
-            case _:
-                caption = text(bold('Війна закінчена або не розпочата 😔'))
+        current_utc_time = datetime.utcnow()
+        if timeline is not None and current_utc_time < timeline.start:
+            end_time = self._get_state_endtime(timeline.start)
+            caption = text(bold('⏰ Час до закінчення підготовки: ', end_time))
+
+        elif timeline is not None and current_utc_time < timeline.end:
+            end_time = self._get_state_endtime(timeline.end)
+            caption = text(bold('⏰ Час до кінця бою: ', end_time))
+
+        else:
+            caption = text(bold('Війна закінчена або не розпочата 😔'))
         
         return caption
+
+
+    def _save_war_timeline(self, clan_tag: str, cw_info: dict) -> WarTimeline | None:
+        '''Takes clan tag and current CW info in json format, saves timeline of the war into `war_timelines` cache.
+
+        Returns the timeline, or None if the clan isn't in preparation or battle day.'''
+
+        timeline = self._parse_war_timeline(cw_info) if cw_info.get('state') in ('preparation', 'inWar') else None
+        war_timelines.put_war(clan_tag, timeline)
+        return timeline
          
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
     
@@ -190,29 +221,28 @@ class ClanDataExtractions(DataBaseManipulations, Parsers):
         '''Takes clan tag, collects members info from DB, returns formatted clan memberlist to message 
         caption if the corresponding polling is started, else starts it and calls func `self.get_caption_memberlist(clan_tag: str)` recursively.
         
-        If there is no members info (in DB), thant raises `mysql.connector.errors.ProgrammingError` error and 
+        If there is no members info (in DB), thant raises `errors.DataBaseProgrammingError` error and 
         returns corresponding message error.'''
 
         try:
 
-            members_info_db_response = self.fetch_all(SelectQuery('member_name, member_tag, member_role', Tables.ClanMembers.value, f"WHERE clan_tag = %s", (clan_tag, )))
-            match members_info_db_response:
+            caption = await self.consume_rows(SelectQuery('member_name, member_tag, member_role', Tables.ClanMembers.value, f"WHERE clan_tag = %s", (clan_tag, )),
+                                              self._parse_clan_memberlist_to_caption)
+            match caption:
                 
-                case []:
-                    clan_members_response = request_to_api(f'clans/%23{clan_tag[1:]}/members')
+                case '':
+                    clan_members_response = await request_to_api(f'clans/%23{clan_tag[1:]}/members')
                     await Polling().poll_clan_memberlist(Response(
                                                                   clan_members_response.status_code,
                                                                   clan_members_response.json_api_response_info
                                                                   ),
-                                                         clan_tag)
-                    return await self.get_caption_memberlist(clan_tag)
-
-                case _:
-                    caption = self._parse_clan_memberlist_to_caption(members_info_db_response)
+                                                         clan_tag, force = True)
+                    with read_your_writes():
+                        return await self.get_caption_memberlist(clan_tag)
 
             return caption
 
-        except mysql.connector.errors.ProgrammingError:
+        except DataBaseProgrammingError:
             caption = text(bold('З моєю Базою Даних сталася помилка 😔'))
             return caption
 
@@ -228,10 +258,10 @@ class ClanDataExtractions(DataBaseManipulations, Parsers):
         try:
 
             is_polling_cwl_memberlist_launched_flag = self._is_launched_cwl_memberlist_polling()
-            clantag_into_the_cwl_memberlist_table_flag = self.fetch_one(SelectQuery('clan_tag', Tables.CWL_members.value, f"WHERE clan_tag = %s", (clan_tag,)))
+            clantag_into_the_cwl_memberlist_table_flag = await self.fetch_one(SelectQuery('clan_tag', Tables.CWL_members.value, f"WHERE clan_tag = %s", (clan_tag,)))
                           
             if not is_polling_cwl_memberlist_launched_flag:
-                current_cwl_response = request_to_api(f'clans/%23{clan_tag[1:]}/currentwar/leaguegroup') #HERE IS SLICE BECAUSE API ALREADY HAS PARSED SYMBOL '#' INTO THE LINK
+                current_cwl_response = await request_to_api(f'clans/%23{clan_tag[1:]}/currentwar/leaguegroup') #HERE IS SLICE BECAUSE API ALREADY HAS PARSED SYMBOL '#' INTO THE LINK
                 await self._insert_cwl_memberlist_in_DB(
                                                         Response(
                                                                  current_cwl_response.status_code, 
@@ -241,7 +271,7 @@ class ClanDataExtractions(DataBaseManipulations, Parsers):
                                                        ) 
 
             if not clantag_into_the_cwl_memberlist_table_flag:
-                current_cwl_response = request_to_api(f'clans/%23{clan_tag[1:]}/currentwar/leaguegroup') #HERE IS SLICE BECAUSE API ALREADY HAS PARSED SYMBOL '#' INTO THE LINK
+                current_cwl_response = await request_to_api(f'clans/%23{clan_tag[1:]}/currentwar/leaguegroup') #HERE IS SLICE BECAUSE API ALREADY HAS PARSED SYMBOL '#' INTO THE LINK
                 await self._insert_cwl_memberlist_in_DB(
                                                         Response(
                                                                  current_cwl_response.status_code, 
@@ -250,8 +280,9 @@ class ClanDataExtractions(DataBaseManipulations, Parsers):
                                                         clan_tag
                                                        ) 
 
-            members_info = self.fetch_all(SelectQuery('*', Tables.CWL_members.value, f"WHERE clan_tag = %s", (clan_tag,)))
-            caption = self._parse_cwl_memberlist_to_caption(members_info)
+            with read_your_writes():
+                caption = await self.consume_rows(SelectQuery('*', Tables.CWL_members.value, f"WHERE clan_tag = %s", (clan_tag,)),
+                                                  self._parse_cwl_memberlist_to_caption)
             return caption
 
 
@@ -260,7 +291,7 @@ class ClanDataExtractions(DataBaseManipulations, Parsers):
             return caption
 
         except ClanWarEndedError:
-            self.delete(Tables.CWL_members.value, f"WHERE clan_tag = '{clan_tag}'")
+            await self.delete(Tables.CWL_members.value, f"WHERE clan_tag = '{clan_tag}'")
             caption = text(bold('Війна закінчена, неможливо дізнатися учасників 😔'))
             return caption
 
@@ -304,12 +335,13 @@ class ClanDataExtractions(DataBaseManipulations, Parsers):
 
             case 200:
 
+                clan_states.observe_cwl(clan_tag, response.json_api_response_info['state'])
                 if response.json_api_response_info['state'] in ['inWar', 'preparation']:
 
                     json_necessary_clan_info = self._find_necessary_clan(response.json_api_response_info, clan_tag)
                     memberlist = json_necessary_clan_info['members']
                     members_info = self._get_cwl_members_info(memberlist)
-                    self._update_cwl_memberlist_in_DB(members_info, clan_tag)
+                    await self._update_cwl_memberlist_in_DB(members_info, clan_tag)
 
 
                 else:
@@ -350,16 +382,14 @@ class ClanDataExtractions(DataBaseManipulations, Parsers):
         return ClanWarLeagueMembersInfo(members_names, members_tags, members_townhalls)
 
     
-    def _update_cwl_memberlist_in_DB(self, members_info: ClanWarLeagueMembersInfo, clan_tag: str):
+    async def _update_cwl_memberlist_in_DB(self, members_info: ClanWarLeagueMembersInfo, clan_tag: str):
         '''Takes typehinting class ClanWarLeagueMembersInfo, clan tag as a parameters.
         
-        Inserts members info into the table `ClanWarLeague_members`.'''
+        Inserts members info into the table `ClanWarLeague_members` by one batch.'''
 
-        for member_name, member_tag, townHallLevel in zip(members_info.members_names, members_info.members_tags, members_info.members_townHallLevel):
-            self.insert(Tables.CWL_members.value, {'member_name' : member_name,
-                                                   'member_tag' : member_tag,
-                                                   'townHallLevel' : townHallLevel,
-                                                   'clan_tag' : clan_tag}, ignore=True)
+        rows = [(member_name, member_tag, townHallLevel, clan_tag) for member_name, member_tag, townHallLevel
+                in zip(members_info.members_names, members_info.members_tags, members_info.members_townHallLevel)]
+        await self.insert_many(Tables.CWL_members.value, ('member_name', 'member_tag', 'townHallLevel', 'clan_tag'), rows, ignore = True)
 
     #------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -368,12 +398,14 @@ class ClanDataExtractions(DataBaseManipulations, Parsers):
         Sends request to API about current CWL war. Continues operation if status code of response equals to 200.
         Else raises `BadRequestError`.
         
-        Then checks if CWL state is "ended" and continues operation, if it's true.
+        Then checks if CWL state is "ended" and continues operation, if it's true: rounds are loaded concurrently,
+        the message about start of the process shows loaded rounds and is replaced by the results at the end,
+        in this case returns None.
         
         Else returns corresponding message caption error.'''
 
         try:
-            cwl_info_response = request_to_api(f'clans/%23{clan_tag[1:]}/currentwar/leaguegroup') #here is slice because '#' in api link already parsed as '%23'
+            cwl_info_response = await request_to_api(f'clans/%23{clan_tag[1:]}/currentwar/leaguegroup') #here is slice because '#' in api link already parsed as '%23'
             match cwl_info_response.status_code:
 
                 case 200:
@@ -382,14 +414,24 @@ class ClanDataExtractions(DataBaseManipulations, Parsers):
                     is_cwl_ended = self._is_cwl_ended(cwl_info_json['state'])
                     if is_cwl_ended:
                         
-                        members_authentificated_flag = self._is_clanmembers_authentificated_in_table(clan_tag)
-                        await self._notify_about_start_of_the_process(chat_id)
+                        progress_message = await self._notify_about_start_of_the_process(chat_id)
+                        last_edit = time.monotonic()
 
-                        if members_authentificated_flag:
-                            self._load_cwl_results_in_table(clan_tag, cwl_info_json['rounds'])
+                        async def show_progress(loaded_rounds: int, all_rounds: int):
+                            nonlocal last_edit
+                            if loaded_rounds == all_rounds or time.monotonic() - last_edit < ProgressMessageEditInterval: #the last one is replaced by results, frequent edits are limited by Telegram
+                                return
+                            last_edit = time.monotonic()
+                            await self._edit_progress_message(progress_message, f'У процесі 😌 {loaded_rounds}/{all_rounds} раундів')
+
+                        await self._load_cwl_results_in_table(clan_tag, cwl_info_json['rounds'], show_progress)
                         
-                        members_info = self.fetch_all(SelectQuery('*', Tables.CWL_results.value, f"WHERE clan_tag = %s ORDER BY avg_score DESC", (clan_tag,)))
-                        caption = self._parse_cwl_results_to_caption(members_info)
+                        with read_your_writes():
+                            caption = await self.consume_rows(SelectQuery('member_name, member_tag, stars, attacks, avg_score, avg_destruction, three_star_rate',
+                                                                          Tables.CWL_results.value, f"WHERE clan_tag = %s ORDER BY avg_score DESC", (clan_tag,)),
+                                                              self._parse_cwl_results_to_caption)
+                        if await self._replace_progress_message(progress_message, caption):
+                            return None
                         return caption
 
                     else:
@@ -406,127 +448,188 @@ class ClanDataExtractions(DataBaseManipulations, Parsers):
             caption = text(bold('З мого боку сталася помилка або дані до минулого ЛВК наразі недоступні 😔'))
             return caption
 
-    def _load_cwl_results_in_table(self, clan_tag: str, cwl_rounds_info_json: dict):
+    async def _load_cwl_results_in_table(self, clan_tag: str, cwl_rounds_info_json: dict, on_round_loaded = None):
         '''Takes clan tag and list of CWL rounds in json format, collects list of rounds with tags of each skirmishe
         in it and calls func `_handle_necessary_round_war_tag` with necessary list of skirmishe and clan tag as a parameters.
-        '''
 
-        rounds = map(self._collect_cwl_round_tags, cwl_rounds_info_json)
-        for war_tags in rounds:
-            self._handle_necessary_round_war_tag(war_tags, clan_tag)
+        Rounds are handled concurrently, up to `CWLRoundsConcurrency` at the same time; after each handled round
+        awaits `on_round_loaded(loaded rounds, all rounds)`, if it's passed.
 
-    
-    def _collect_cwl_round_tags(self, cwl_rounds_info_json: dict):
-        '''Extracts skirmishes tags from each round.
-        
-        Returns taglist of the skirmishes.'''
+        Results of all loaded skirmishes are aggregated in memory by `CWLSeasonStatistics` and written into the DB once at the end.
+        Wars already seen by previous runs are taken from the table `ClanWarLeague_wars`, so results of each war are loaded only once;
+        loading of the clan holds its lock from reading of the seen wars to saving of the new ones, so concurrent commands can't add the same wars twice.
+        '''
 
-        return cwl_rounds_info_json['warTags']
+        async with self._cwl_loading_locks.setdefault(clan_tag, asyncio.Lock()):
+            seen_wars = await self._fetch_seen_cwl_wars(clan_tag)
+            rounds = list(map(self._collect_cwl_round_tags, cwl_rounds_info_json))
+            semaphore = asyncio.Semaphore(CWLRoundsConcurrency)
+            season = CWLSeasonStatistics(clan_tag)
+            loaded_wars = []
+            loaded_rounds = 0
 
+            async def handle_round(war_tags: list):
+                nonlocal loaded_rounds
+                async with semaphore:
+                    await self._handle_necessary_round_war_tag(war_tags, clan_tag, seen_wars, season, loaded_wars)
+                loaded_rounds += 1
+                if on_round_loaded is not None:
+                    await on_round_loaded(loaded_rounds, len(rounds))
 
-    def _handle_necessary_round_war_tag(self, cwl_round_war_tags: list, clan_tag: str):
-        '''Takes list of skirmishes tags and clan tag as a parameters, makes for each api request about results
-        of it and checks the side played by the clan.
-        
-        Then start initialization of membersinfo into the table ClanWarLeague_results.'''
+            await asyncio.gather(*(handle_round(war_tags) for war_tags in rounds))
+            await self._insert_cwl_members_results_in_table(season, loaded_wars)
 
-        for tag in cwl_round_war_tags:
-            war_info = request_to_api(f'clanwarleagues/wars/%23{tag[1:]}').json_api_response_info
-            clan_tag_fixed = clan_tag.replace('O', '0')
 
-            if war_info['clan']['tag'] == clan_tag_fixed: 
-                self._initialize_cwl_memberlist_table('clan', war_info, clan_tag)
-                
-            
-            if war_info['opponent']['tag'] == clan_tag_fixed:
-                self._initialize_cwl_memberlist_table('opponent', war_info, clan_tag)
+    async def _fetch_seen_cwl_wars(self, clan_tag: str) -> dict[str, tuple[str | None, str]]:
+        '''Returns wars of the table `ClanWarLeague_wars` seen for the clan: {war tag: (side played by the clan or None, war state)}.'''
+
+        with read_your_writes():
+            rows = await self.fetch_all(SelectQuery('war_tag, clan_side, state', Tables.CWL_wars.value, f"WHERE clan_tag = %s", (clan_tag,)))
+        return {war_tag: (clan_side, state) for war_tag, clan_side, state in rows}
 
     
-    def _initialize_cwl_memberlist_table(self, clan_war_side: str, war_info: dict, clan_tag: str):
-        '''Takes the side played by the clan, information about the results of the skirmish and clan tag as a parameters.
+    def _collect_cwl_round_tags(self, cwl_rounds_info_json: dict):
+        '''Extracts skirmishes tags from each round.
         
-        Extracts members info from skirmishe results and inserts information of each clan memebrs into the table ClanWarLeague_results.'''
-
-        members_cwl_results = self._extract_members_info(war_info[clan_war_side]['members'])
-        for member_cwl_result in members_cwl_results:
-            self._insert_cwl_member_result_in_table(member_cwl_result, clan_tag)
+        Returns taglist of the skirmishes.'''
 
+        return cwl_rounds_info_json['warTags']
 
-    def _extract_members_info(self, member_cwl_result: dict) -> Generator:
-        '''Takes cwl members results as a parameter and divides members names, tags and earned stars into the 3 separate generators.
-        
-        combines information about each member into a single generator from typehinting classes `ClanWarLeagueMembersAttacksResult`.'''
 
+    async def _handle_necessary_round_war_tag(self, cwl_round_war_tags: list, clan_tag: str, seen_wars: dict,
+                                              season: CWLSeasonStatistics, loaded_wars: list[tuple]):
+        '''Takes list of skirmishes tags, clan tag, wars seen by previous runs, statistics of the season and list of loaded skirmishes
+        as a parameters, finds the skirmish of the clan and checks the side played by the clan.
 
-        members_names = (member['name'] for member in member_cwl_result)
-        members_tags = (member['tag'] for member in member_cwl_result)
-        members_stars = self._get_member_attacks_per_cwl_round(member_cwl_result)
+        Skirmishes of other clans, seen before, aren't requested again; when the skirmish of the clan is found,
+        the rest of the round isn't requested. Results of the ended skirmish are loaded only once.
+        
+        Then adds members results of the ended skirmish to `season` and row (war_tag, clan_tag, clan_side, state) of each requested skirmish
+        to `loaded_wars`.'''
+
+        war_tags = [tag for tag in cwl_round_war_tags if tag != '#0'] #'#0' - skirmish isn't scheduled yet
+        clan_war_tag = next((tag for tag in war_tags if seen_wars.get(tag, (None,))[0] is not None), None)
+        if clan_war_tag is not None:
+            if seen_wars[clan_war_tag][1] == 'warEnded':
+                return
+            war_tags = [clan_war_tag]
+
+        clan_tag_fixed = clan_tag.replace('O', '0')
+        for tag in war_tags:
+            if tag in seen_wars and seen_wars[tag][0] is None:
+                continue
 
-        for member_name, member_tag, member_stars in zip(members_names, members_tags, members_stars):
-            
-            yield ClanWarLeagueMembersAttacksResult(member_name, member_tag, member_stars)
+            war_info = await self._request_cwl_war(tag)
+            if war_info['clan']['tag'] == clan_tag_fixed:
+                clan_war_side = 'clan'
+            elif war_info['opponent']['tag'] == clan_tag_fixed:
+                clan_war_side = 'opponent'
+            else:
+                clan_war_side = None
 
+            if clan_war_side is not None and war_info.get('state') == 'warEnded':
+                season.add_war(war_info[clan_war_side]['members'])
+            loaded_wars.append((tag, clan_tag, clan_war_side, war_info.get('state')))
+            seen_wars[tag] = (clan_war_side, war_info.get('state'))
+            if clan_war_side is not None:
+                return
 
-    def _insert_cwl_member_result_in_table(self, member_cwl_result: ClanWarLeagueMembersAttacksResult, clan_tag: str):
-        '''Takes member cwl result in the form of typehinting class `ClanWarLeagueMembersAttacksResult` and clan tag as a parameters;
 
-        then finally inserts member info into the table `ClanWarLeague_results`.'''
+    async def _request_cwl_war(self, war_tag: str) -> dict:
+        '''Returns information about the skirmish, ended skirmishes are taken from `ended_wars` cache without request to the API.'''
 
-        self.insert(Tables.CWL_results.value, {"member_name": member_cwl_result.members_names, "member_tag" : member_cwl_result.members_tags, "stars" : member_cwl_result.members_stars,
-                    "attacks" : 1, "avg_score" : member_cwl_result.members_stars, "clan_tag": clan_tag}, ignore = False,
-                    expression = f"ON DUPLICATE KEY UPDATE stars = IF(clan_tag = '{clan_tag}', stars + VALUES(stars), stars), attacks = IF(clan_tag = '{clan_tag}', attacks+1, attacks), avg_score = stars / attacks")
+        war_info = ended_wars.get(war_tag)
+        if war_info is None:
+            war_info = (await request_to_api(f'clanwarleagues/wars/%23{war_tag[1:]}')).json_api_response_info
+            ended_wars.put(war_tag, war_info)
+        return war_info
 
     
-    @staticmethod
-    def _get_member_attacks_per_cwl_round(memberlist: dict) -> Generator:
-        '''Separate generator function takes information of each member in memberlist and returns number of earned stars as int.'''
-
-        for member in memberlist:
-            try:
-                yield int(member['attacks'][0]['stars'])
+    async def _insert_cwl_members_results_in_table(self, season: CWLSeasonStatistics, loaded_wars: list[tuple]):
+        '''Takes statistics of the members in the loaded skirmishes and rows (war_tag, clan_tag, clan_side, state) of these skirmishes as a parameters;
+
+        then finally adds totals of each member to the table `ClanWarLeague_results` by one bulk upsert and saves the skirmishes into the table `ClanWarLeague_wars`.
+        Both are committed by one transaction, so results of the skirmish can't be added twice.'''
+
+        if not loaded_wars:
+            return
+
+        clan_tag = season.clan_tag
+        rows = season.aggregate()
+        update_if_clan = lambda column, value: f"{column} = IF(clan_tag = '{clan_tag}', {value}, {column})"
+
+        def insert_results():
+            with self.sync.transaction() as conn:
+                self.sync.insert_many(Tables.CWL_results.value, RESULTS_COLUMNS, rows, ignore = False,
+                            expression = 'ON DUPLICATE KEY UPDATE ' + ', '.join(( #averages go first: they must use the old sums on each engine
+                                update_if_clan('avg_score', 'ROUND((stars + VALUES(stars)) * 1.0 / (attacks + VALUES(attacks)), 3)'),
+                                update_if_clan('avg_destruction', 'ROUND((destruction + VALUES(destruction)) * 1.0 / (attacks + VALUES(attacks)), 2)'),
+                                update_if_clan('three_star_rate', 'ROUND((three_stars + VALUES(three_stars)) * 1.0 / (attacks + VALUES(attacks)), 3)'),
+                                update_if_clan('stars', 'stars + VALUES(stars)'),
+                                update_if_clan('destruction', 'destruction + VALUES(destruction)'),
+                                update_if_clan('three_stars', 'three_stars + VALUES(three_stars)'),
+                                update_if_clan('attacks', 'attacks + VALUES(attacks)'))),
+                            conn = conn)
+                self.sync.insert_many(Tables.CWL_wars.value, ('war_tag', 'clan_tag', 'clan_side', 'state'), loaded_wars, ignore = False,
+                            expression = "ON DUPLICATE KEY UPDATE clan_side = VALUES(clan_side), state = VALUES(state)", conn = conn)
+
+        await self.run_sync(insert_results)
+
+
+    async def _notify_about_start_of_the_process(self, chat_id: int, __ParseMode = ParseMode.MARKDOWN_V2) -> Message:
+        '''Takes chat id and ParseMode as a parameters, serves to notify the user, that obtaining information about each member of the CWL began.
+        Returns directly into the chat message, that process began, and returns the sent message.'''
 
-            except KeyError:
-                yield 0
+        caption_pre_result = text(bold('У процесі 😌'))
+        message = await bot.send_message(chat_id, caption_pre_result, __ParseMode)
+        await bot.send_chat_action(chat_id, 'typing')
+        return message
 
 
-    def _is_clanmembers_authentificated_in_table(self, clan_tag: str) -> bool:
-        '''Takes clan tag as a parameter and check if clan already exists in the table.
+    async def _edit_progress_message(self, message: Message, progress: str, __ParseMode = ParseMode.MARKDOWN_V2):
+        '''Takes message about start of the process and progress caption as a parameters, shows the progress in the message.
         
-        Serves to determine, is it worth to do request about each member to the api, or just load
-            information about each member from the table and don't spend extra resources for requests.
-            
-        Returns 0 or 1, that equals to False or True when it will come to theck results.'''
+        Progress is only a hint for the user, so errors of Telegram are logged and ignored.'''
 
-        cursor = self.get_cursor()
-        clan_tag_fixed = clan_tag.replace('0', 'O')
-        cursor.execute(f'SELECT CASE WHEN EXISTS(SELECT clan_tag FROM {Tables.CWL_results.value} WHERE clan_tag = "{clan_tag_fixed}") THEN 0 ELSE 1 END AS IsEmpty')
-        result = cursor.fetchone()
-        cursor.close()
-        return result
+        await self._replace_progress_message(message, text(bold(progress)), __ParseMode)
 
-    async def _notify_about_start_of_the_process(self, chat_id: int, __ParseMode = ParseMode.MARKDOWN_V2):
-        '''Takes chat id and ParseMode as a parameters, serves to notify the user, that obtaining information about each member of the CWL began.
-        Returns directly into the chat message, that process began.'''
 
-        caption_pre_result = text(bold('У процесі 😌'))
-        await bot.send_message(chat_id, caption_pre_result, __ParseMode)
-        await bot.send_chat_action(chat_id, 'typing')
+    async def _replace_progress_message(self, message: Message, caption: str, __ParseMode = ParseMode.MARKDOWN_V2) -> bool:
+        '''Takes message about start of the process and new caption as a parameters, replaces text of the message by the caption.
+        
+        Returns False if the message can't be edited (e.g. it was deleted), so the caption must be sent by a new message.'''
+
+        try:
+            await bot.edit_message_text(caption, message.chat.id, message.message_id, parse_mode = __ParseMode)
+        except MessageNotModified:
+            pass
+        except TelegramAPIError as error:
+            logging.warning(f'Progress message {message.message_id} in the chat {message.chat.id} is not edited: {error}')
+            return False
+        return True
 
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
     
     async def get_cwl_status(self, clan_tag):
         '''Takes clan tag as a parameter, sends request to the API about current CWL war of the clan.
         
-        Continues operation if resposne status code equals to 200, else raises BadRequestError.'''
+        Continues operation if resposne status code equals to 200, else raises BadRequestError.
+
+        The API isn't requested while timeline of the current round is kept in `war_timelines` cache.'''
+
+        cached_round = war_timelines.get_cwl_round(clan_tag)
+        if cached_round is not None:
+            return self._get_end_time_of_the_current_round_state(*cached_round)
 
         try:
 
-            cwl_info_response = request_to_api(f'clans/%23{clan_tag[1:]}/currentwar/leaguegroup') #here is slice because '#' in api link already parsed as '%23'
+            cwl_info_response = await request_to_api(f'clans/%23{clan_tag[1:]}/currentwar/leaguegroup') #here is slice because '#' in api link already parsed as '%23'
             match cwl_info_response.status_code:
 
                 case 200:
 
                     cwl_info_json = cwl_info_response.json_api_response_info
+                    clan_states.observe_cwl(clan_tag, cwl_info_json['state'])
                     is_cwl_ended = self._is_cwl_ended(cwl_info_json['state'])
                     if is_cwl_ended:
 
@@ -535,10 +638,12 @@ class ClanDataExtractions(DataBaseManipulations, Parsers):
 
                     else:
 
-                        rounds = map(self._collect_cwl_round_tags, cwl_info_json['rounds'])
-                        last_available_round = self._define_last_available_round(rounds)
-                        round_war_tag = list(rounds)[last_available_round][0]
-                        caption = self._get_end_time_of_the_current_round_state(current_round_tag = round_war_tag, current_round_number = last_available_round)
+                        current_round = await self._load_cwl_round_timeline(clan_tag, cwl_info_json['rounds'])
+                        if current_round is None:
+                            caption = text(bold('Раунди ЛВК ще не оголошені 😌'))
+                            return caption
+
+                        caption = self._get_end_time_of_the_current_round_state(*current_round)
                         return caption
 
                 case 404:
@@ -563,53 +668,68 @@ class ClanDataExtractions(DataBaseManipulations, Parsers):
         else:
             return index
 
-    def _get_end_time_of_the_current_round_state(self, current_round_tag: list[str], current_round_number: int) -> str:
-        '''Takes current round tag and current roudn number as a parameters, defines caption for index 0 and 6
+    async def _load_cwl_round_timeline(self, clan_tag: str, cwl_rounds_info_json: list, priority: RequestPriority = RequestPriority.interactive) -> tuple[int, WarTimeline] | None:
+        '''Takes clan tag, list of CWL rounds in json format and priority lane of the request as a parameters,
+        requests skirmish of the last announced round (all skirmishes of the round have the same schedule).
+
+        Saves index and timeline of the round into `war_timelines` cache and returns them;
+        returns None if no round is announced yet or the API didn't return the skirmish.'''
+
+        rounds = list(map(self._collect_cwl_round_tags, cwl_rounds_info_json))
+        last_available_round = self._define_last_available_round(rounds) if rounds else -1
+        if last_available_round < 0: #the first round isn't announced yet, its skirmishes are '#0'
+            return None
+
+        round_war_tag = rounds[last_available_round][0]
+        round_response = await request_to_api(f'clanwarleagues/wars/%23{round_war_tag[1:]}', priority)
+        if round_response.status_code != 200:
+            return None
+
+        timeline = self._parse_war_timeline(round_response.json_api_response_info)
+        valid_until = timeline.end if last_available_round == len(rounds) - 1 else timeline.start #the next round is announced by the start of this one
+        war_timelines.put_cwl_round(clan_tag, last_available_round, timeline, valid_until)
+        return last_available_round, timeline
+
+
+    def _get_end_time_of_the_current_round_state(self, current_round_number: int, timeline: WarTimeline) -> str:
+        '''Takes current round number and its timeline as a parameters, defines caption for index 0 and 6
         
         because computing of the state end time is different in according with others cases.
         
         Returns prepared message caption.'''
 
-        current_utc_time = str(datetime.utcnow()).split('.')[0] #.split() BECAUSE WE NEED TO GET RID OF MICROSECONDS
-        round_info = request_to_api(f'clanwarleagues/wars/%23{current_round_tag[1:]}').json_api_response_info
         match current_round_number:
 
             case 0:
 
-                result = self._get_state_endtime('startTime', round_info, current_utc_time)
+                result = self._get_state_endtime(timeline.start)
                 caption = text(bold(f'Час до початку першого раунду: {result} 🕔'))
 
             case 6:
-                
-                state = round_info['state']
 
-                if state == 'preparation':
+                if datetime.utcnow() < timeline.start: #preparation day
 
-                    result = result = self._get_state_endtime('startTime', round_info, current_utc_time)
+                    result = self._get_state_endtime(timeline.start)
                     caption = text(bold(f'Час до початку останнього раунду: {result} 🕔'))
 
-                if state == 'inWar':
+                else:
 
-                    result = result = self._get_state_endtime('endTime', round_info, current_utc_time)
+                    result = self._get_state_endtime(timeline.end)
                     caption = text(bold(f'Час до кінця останнього раунду: {result} 🕔'))
 
             case _:
 
-                result = self._get_state_endtime('endTime', round_info, current_utc_time)
+                result = self._get_state_endtime(timeline.end)
                 caption = text(bold(f'Час до кінця {current_round_number} раунду: {result} 🕔'))
 
         return caption
 
 
-    def _get_state_endtime(self, event_time: str, round_info: dict, current_utc_time: str):
-        '''Computing state end time by subtracting from current utc time, returns -> datetime.datetime.timedelta'''
-
-        parsed_starttime = self._parse_datetime(round_info[event_time])
-        formatted_event_time = datetime.strptime(f'{parsed_starttime.year}-{parsed_starttime.month}-{parsed_starttime.day} {parsed_starttime.hour}:{parsed_starttime.minute}:{parsed_starttime.seconds}', '%Y-%m-%d %H:%M:%S')
-        formatted_current_utc_time = datetime.strptime(current_utc_time, '%Y-%m-%d %H:%M:%S')
+    @staticmethod
+    def _get_state_endtime(event_time: datetime) -> timedelta:
+        '''Computing state end time by subtracting current utc time from the time of the event, returns -> datetime.timedelta'''
 
-        result = formatted_event_time - formatted_current_utc_time
-        return result
+        return event_time - datetime.utcnow().replace(microsecond = 0) #without microseconds, so the countdown is shown in whole seconds
 
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
@@ -621,7 +741,7 @@ class ClanDataExtractions(DataBaseManipulations, Parsers):
         Returns message caption for the user, corresponding to the each error, that met in the process.'''
 
         try:
-            cw_api_response = request_to_api(f'clans/%23{clan_tag[1:]}/currentwar') #here is slice because '#' in api link already parsed as '%23'
+            cw_api_response = await request_to_api(f'clans/%23{clan_tag[1:]}/currentwar') #here is slice because '#' in api link already parsed as '%23'
             match cw_api_response.status_code:
 
                 case 200:
@@ -671,33 +791,69 @@ class ClanDataExtractions(DataBaseManipulations, Parsers):
 
         try:
 
-            members_info = self.fetch_all(SelectQuery('member_name, collected_coins, donated_coins, saved_coins', Tables.RadeMembers.value, f"WHERE clan_tag = %s", (clan_tag,)))
-            match members_info:
+            caption = await self.consume_rows(SelectQuery('member_name, collected_coins, donated_coins, saved_coins, raid_looted, raid_attacks, raid_attack_limit',
+                                                          Tables.RadeMembers.value, f"WHERE clan_tag = %s ORDER BY raid_looted DESC", (clan_tag,)),
+                                              self._parse_rade_statistic_to_caption)
+            match caption:
                 
-                case []:
+                case '':
                     
                     await self._notify_about_start_of_the_process(chat_id)
-                    clan_members_response = request_to_api(f'clans/%23{clan_tag[1:]}/members').json_api_response_info
-                    await Polling().poll_rade_statistic(clan_members_response, clan_tag)
-                    return await self.get_caption_rade_statistic(clan_tag, chat_id)
+                    clan_members_response = (await request_to_api(f'clans/%23{clan_tag[1:]}/members')).json_api_response_info
+                    await Polling().poll_rade_statistic(clan_members_response, clan_tag, RequestPriority.interactive, force = True)
+                    with read_your_writes():
+                        return await self.get_caption_rade_statistic(clan_tag, chat_id)
 
-                case _:
-                    caption = self._parse_rade_statistic_to_caption(members_info)
-                    
             return caption
 
-        except mysql.connector.errors.DatabaseError:
+        except DataBaseError:
             caption = text(bold('З моэю Базою Даних сталася помилка 😔'))
             return caption
 
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 class Polling(ClanDataExtractions):
+    '''Polls clan data from the API and saves it into the DB.
+
+    Keeps the last written memberlist of each clan and rade results of each member (shared by all instances),
+    skips writes to the DB, when polled data didn't change. Number of the avoided statements is counted in `skipped_writes`.'''
+
+    _memberlist_snapshots: dict[str, int] = {}
+    _rade_snapshots: dict[str, tuple] = {}
+    skipped_writes = {Tables.ClanMembers: 0, Tables.RadeMembers: 0}
+
+    async def poll_war_states(self, clan_tag: str):
+        '''Takes clan tag, requests current CW and CWL of the clan and saves their states into `poll_scheduler.clan_states`,
+        which defines how often the clan is polled, and their timelines into `war_timelines` cache for status commands.'''
 
+        try:
+            cw_response = await request_to_api(f'clans/%23{clan_tag[1:]}/currentwar', RequestPriority.background)
+            if cw_response.status_code == 200:
+                clan_states.observe_war(clan_tag, cw_response.json_api_response_info['state'])
+                self._save_war_timeline(clan_tag, cw_response.json_api_response_info)
+
+            cwl_response = await request_to_api(f'clans/%23{clan_tag[1:]}/currentwar/leaguegroup', RequestPriority.background)
+            match cwl_response.status_code:
+
+                case 200:
+                    cwl_info_json = cwl_response.json_api_response_info
+                    clan_states.observe_cwl(clan_tag, cwl_info_json['state'])
+                    if cwl_info_json['state'] in ('preparation', 'inWar') and war_timelines.get_cwl_round(clan_tag) is None:
+                        await self._load_cwl_round_timeline(clan_tag, cwl_info_json['rounds'], RequestPriority.background)
+
+                case 404: #clan doesn't take part in the CWL
+                    clan_states.observe_cwl(clan_tag, 'notInWar')
+
+        except (ClientError, asyncio.TimeoutError):
+            logging.exception('Connection error from back-end concern...')
+
+        except (KeyError, ValueError): #unexpected API response mustn't stop the rest of the clan polling
+            logging.exception(f'PollWarStates: unexpected API response about wars of {clan_tag}')
 
-    async def poll_clan_memberlist(self, clan_members_response: Response, clan_tag: str): 
+
+    async def poll_clan_memberlist(self, clan_members_response: Response, clan_tag: str, force: bool = False): 
         '''Takes polling response and clan tag as a parameter.
-        Inserts data into the `ClanMembers` table.'''
+        Inserts data into the `ClanMembers` table, if memberlist changed since the last poll or `force` is True.'''
 
         try:
             members_info = self._get_clan_memberlist(
@@ -707,10 +863,16 @@ class Polling(ClanDataExtractions):
                                                             )
                                                     )
 
-            self._update_memberlist_in_DB(members_info, clan_tag)
+            snapshot = hash(tuple(zip(members_info.members_names, members_info.members_tags, members_info.members_roles)))
+            if not force and self._memberlist_snapshots.get(clan_tag) == snapshot:
+                self.skipped_writes[Tables.ClanMembers] += 2 #DELETE and the batch INSERT
+                return
+
+            await self._update_memberlist_in_DB(members_info, clan_tag)
+            self._memberlist_snapshots[clan_tag] = snapshot
 
             
-        except ConnectionError:
+        except (ClientError, asyncio.TimeoutError):
             logging.exception('Connection error from back-end concern...')
 
         except BadRequestError:
@@ -735,38 +897,84 @@ class Polling(ClanDataExtractions):
                 raise BadRequestError()
 
     
-    def _update_memberlist_in_DB(self, members_info: ClanMembersInfo, clan_tag: str):
+    async def _update_memberlist_in_DB(self, members_info: ClanMembersInfo, clan_tag: str):
         '''Takes typehinting class `ClanMembersInfo and clan tag as a parameters.
         
         Deletes extra members from the table, that was kicked/banned in the clan and don't existing anymore.
         
-        Inserts new clan members into the table.`'''
-        self.delete(Tables.ClanMembers.value, f"WHERE clan_tag = '{clan_tag}' AND member_tag NOT IN {tuple(members_info.members_tags)}")
+        Inserts new clan members into the table by one batch.
+
+        Both statements are committed by one transaction.`'''
+
+        rows = [(member_name, member_tag, member_role, clan_tag) for member_name, member_tag, member_role
+                in zip(members_info.members_names, members_info.members_tags, members_info.members_roles)]
 
-        for member_name, member_tag, member_role in zip(members_info.members_names, members_info.members_tags, members_info.members_roles):
-            self.insert(Tables.ClanMembers.value, {'member_name': member_name,
-                        'member_tag' : member_tag,
-                        'member_role' : member_role,
-                        'clan_tag' : clan_tag}, ignore = True)
+        def update_memberlist():
+            with self.sync.transaction() as conn:
+                self.sync.delete(Tables.ClanMembers.value, f"WHERE clan_tag = '{clan_tag}' AND member_tag NOT IN {tuple(members_info.members_tags)}", conn = conn)
+                self.sync.insert_many(Tables.ClanMembers.value, ('member_name', 'member_tag', 'member_role', 'clan_tag'), rows, ignore = True, conn = conn)
+
+        await self.run_sync(update_memberlist)
 
 #------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-    async def poll_rade_statistic(self, json_clan_members_response: dict, clan_tag: str):
-        '''Starts send polling requests to the API about achievements of each clan member,
-            that storages members results in rade wars.
-        Inserts members results into the table.'''
+    async def poll_rade_statistic(self, json_clan_members_response: dict, clan_tag: str, priority: RequestPriority = RequestPriority.background, force: bool = False):
+        '''Polls results of the clan members in rade wars: results of all members in the last raid weekend are taken
+        by one request to `capitalraidseasons`.
+            If the clan has no raid seasons, starts send polling requests to the API about achievements of each clan member instead;
+        if the API doesn't return raid seasons, the poll is skipped until the next one.
+        Inserts members results into the table, if they changed since the last poll or `force` is True.
+
+        Requests go to the background lane of the rate limiter, unless the user waits for them in chat.
+        Up to `PollRadeConcurrency` members are requested at the same time; members, which requests failed, are skipped until the next poll.'''
         try:
             
-            members_tags = self._get_clan_members_taglist(json_clan_members_response)
-            for member_tag in members_tags:
-                logging.info(f'PollRadeStatistic:getMemberAchievements | {datetime.now()}')
-                member_info = request_to_api(f'players/%23{member_tag[1:]}')
-                self._insert_member_rade_results_in_table(member_info.json_api_response_info, clan_tag)
+            raid_seasons_response = await self._request_last_raid_season(clan_tag, priority)
+            if raid_seasons_response.status_code != 200: #throttled or unavailable API: the per-player path would only add ~50 requests to it
+                logging.warning(f'PollRadeStatistic: raid seasons of {clan_tag} are not received ({raid_seasons_response.status_code}), the poll is skipped')
+                return
 
-        except ConnectionError:
+            raid_seasons = raid_seasons_response.json_api_response_info.get('items')
+            if raid_seasons:
+                await self._insert_members_raid_season_in_table(raid_seasons[0], json_clan_members_response['items'], clan_tag, force)
+                return
+
+            members_tags = self._get_clan_members_taglist(json_clan_members_response)
+            semaphore = asyncio.Semaphore(PollRadeConcurrency)
+            members_info = await asyncio.gather(*(self._request_member_info(member_tag, priority, semaphore) for member_tag in members_tags),
+                                                return_exceptions = True)
+            received_members_info = [member_info.json_api_response_info for member_info in members_info
+                                     if isinstance(member_info, Response) and member_info.status_code == 200]
+            if len(received_members_info) < len(members_info):
+                logging.warning(f'PollRadeStatistic: {len(members_info) - len(received_members_info)} of {len(members_info)} members of {clan_tag} are not received')
+            await self._insert_members_rade_results_in_table(received_members_info, clan_tag, force)
+
+        except (ClientError, asyncio.TimeoutError):
             logging.exception('Connection error from back-end concern...')
 
 
+    @staticmethod
+    async def _request_last_raid_season(clan_tag: str, priority: RequestPriority) -> Response:
+        '''Takes clan tag and priority lane of the request.
+
+        Returns API response with the last raid weekend of the clan (the first page of `capitalraidseasons` is sorted from the newest season),
+        `items` of the response are empty if the clan has no raid seasons.'''
+
+        logging.info(f'PollRadeStatistic:getCapitalRaidSeasons | {datetime.now()}')
+        return await request_to_api(f'clans/%23{clan_tag[1:]}/capitalraidseasons?limit=1', priority)
+
+
+    @staticmethod
+    async def _request_member_info(member_tag: str, priority: RequestPriority, semaphore: asyncio.Semaphore) -> Response:
+        '''Takes member tag, priority lane of the request and semaphore, that bounds number of the requests in flight.
+
+        Returns API response about the member achievements.'''
+
+        async with semaphore:
+            logging.info(f'PollRadeStatistic:getMemberAchievements | {datetime.now()}')
+            return await request_to_api(f'players/%23{member_tag[1:]}', priority)
+
+
     @staticmethod
     def _get_clan_members_taglist(clan_info: dict) -> Generator:
         '''Takes clan info in a json format as a parameter.
@@ -777,14 +985,71 @@ class Polling(ClanDataExtractions):
         return members_tags
 
 
-    def _insert_member_rade_results_in_table(self, member_info: dict, clan_tag: str):
-        '''Takes member results on a rade and clan tag of his clan as a separate parameter.
+    async def _insert_members_raid_season_in_table(self, raid_season: dict, clan_members: list[dict], clan_tag: str, force: bool = False):
+        '''Takes the last raid weekend of the clan, clan members in json format and clan tag as a parameters.
+
+        Inserts looted capital gold and attacks of the current clan members in the raid weekend (members, that didn't attack, get zeros),
+        that changed since the last poll (or of all members if `force` is True), into the table by one batch.
+        Lifetime achievements of the members, polled before by the per-player path, are cleared, so they aren't shown as current.'''
+
+        raid_members = {member['tag']: member for member in raid_season.get('members', ())}
+        rows = []
+        snapshots = {}
+        for clan_member in clan_members:
+            raid_member = raid_members.get(clan_member['tag'], {})
+            attack_limit = raid_member.get('attackLimit', 0) + raid_member.get('bonusAttackLimit', 0)
+            row = (clan_member['name'], clan_member['tag'], raid_season['startTime'], raid_member.get('capitalResourcesLooted', 0),
+                   raid_member.get('attacks', 0), attack_limit, clan_tag)
+            if not force and self._rade_snapshots.get(clan_member['tag']) == row:
+                continue
+
+            rows.append(row)
+            snapshots[clan_member['tag']] = row
+
+        await self.insert_many(Tables.RadeMembers.value,
+                               ('member_name', 'member_tag', 'raid_season', 'raid_looted', 'raid_attacks', 'raid_attack_limit', 'clan_tag'), rows, ignore = False,
+                               expression = f"ON DUPLICATE KEY UPDATE member_name = VALUES(member_name), raid_season = VALUES(raid_season), raid_looted = VALUES(raid_looted), "
+                                            f"raid_attacks = VALUES(raid_attacks), raid_attack_limit = VALUES(raid_attack_limit), clan_tag = VALUES(clan_tag), "
+                                            f"collected_coins = NULL, donated_coins = NULL, saved_coins = NULL")
+        self._rade_snapshots.update(snapshots)
+        self._count_skipped_rade_batch(rows, clan_members)
+
+
+    @staticmethod
+    def _get_achievement_value(member_info: dict, achievement_name: str) -> int:
+        '''Takes member info in json format and name of the achievement, returns value of the achievement or 0 if the member hasn't it.'''
+
+        return next((achievement['value'] for achievement in member_info.get('achievements', ()) if achievement['name'] == achievement_name), 0)
+
+
+    async def _insert_members_rade_results_in_table(self, members_info: list[dict], clan_tag: str, force: bool = False):
+        '''Takes members results on a rade and clan tag of their clan as a separate parameter.
         
-        Inserts member info into the table.'''
-
-        collected_coins = member_info['achievements'][-2]['value'] #INDEX -2 IT`S NUMBER OF THE NECESSARY ACHIEVEMNT IN ACHIEVEMENTS LIST
-        donated_coins = member_info['achievements'][-1]['value']
-        self.insert(Tables.RadeMembers.value,
-                    {"member_name": member_info['name'], "member_tag": member_info['tag'], "collected_coins" : collected_coins,
-                    "donated_coins" : donated_coins, "saved_coins" : collected_coins - donated_coins, "clan_tag": clan_tag}, ignore = False,
-                    expression = f"ON DUPLICATE KEY UPDATE collected_coins = VALUES(collected_coins), donated_coins = VALUES(donated_coins), saved_coins = VALUES(saved_coins)")                    
+        Inserts info of the members, that changed since the last poll (or of all members if `force` is True), into the table by one batch;
+        results of the raid weekend polled before are cleared, so they aren't shown as current.'''
+
+        rows = []
+        snapshots = {}
+        for member_info in members_info:
+            collected_coins = self._get_achievement_value(member_info, 'Aggressive Capitalism') #capital gold looted in rade wars
+            donated_coins = self._get_achievement_value(member_info, 'Most Valuable Clanmate') #capital gold contributed to the clan capital
+            snapshot = (member_info['name'], collected_coins, donated_coins, clan_tag)
+            if not force and self._rade_snapshots.get(member_info['tag']) == snapshot:
+                continue
+
+            rows.append((member_info['name'], member_info['tag'], collected_coins, donated_coins, collected_coins - donated_coins, clan_tag))
+            snapshots[member_info['tag']] = snapshot
+
+        await self.insert_many(Tables.RadeMembers.value,
+                               ('member_name', 'member_tag', 'collected_coins', 'donated_coins', 'saved_coins', 'clan_tag'), rows, ignore = False,
+                               expression = f"ON DUPLICATE KEY UPDATE collected_coins = VALUES(collected_coins), donated_coins = VALUES(donated_coins), saved_coins = VALUES(saved_coins), "
+                                            f"raid_season = NULL, raid_looted = NULL, raid_attacks = NULL, raid_attack_limit = NULL")
+        self._rade_snapshots.update(snapshots)
+        self._count_skipped_rade_batch(rows, members_info)
+
+
+    def _count_skipped_rade_batch(self, rows: list[tuple], members: list[dict]):
+        '''Counts the batch upsert of the rade results as avoided, if results of all polled members didn't change.'''
+
+        if members and not rows:
+            self.skipped_writes[Tables.RadeMembers] += 1                    
@@ -1,31 +1,50 @@
 from bot_config import bot
-from handle_clan_data import DataBaseManipulations
+from caches import admin_permissions, chat_member_statuses
+from database import AsyncDataBaseManipulations, chat_id_param
+from type_hintings import Tables
 
 async def check_user_status(chat_id: str, user_id: int):
+    '''Returns Telegram status of the chat member, cached for `ChatMemberStatusCacheTTL` seconds.'''
+
+    user_status = chat_member_statuses.get(chat_id, user_id)
+    if user_status is not None:
+        return user_status
 
     user_data = await bot.get_chat_member(chat_id, user_id)
     user_status = user_data['status']
+    chat_member_statuses.put(chat_id, user_id, user_status)
 
     return user_status
 
-class ChatDBManipulations(DataBaseManipulations):
+class ChatDBManipulations(AsyncDataBaseManipulations):
+
 
+    async def _is_member_admin(self, user_id: int, chat_id: int) -> bool:
+        '''Checks if the chat member is in the table `ChatAdmins`, result is cached for `AdminPermissionCacheTTL` seconds.'''
 
-    def _is_member_admin(self, user_id: int, chat_id: int) -> bool:
+        is_admin = admin_permissions.get(chat_id, user_id)
+        if is_admin is not None:
+            return is_admin
 
+        def select_is_admin():
+            with self.sync.connection() as conn:
+                cursor = self.sync.get_cursor(conn)
+                cursor.execute(f'SELECT CASE WHEN EXISTS(SELECT user_name FROM {Tables.ChatAdmins.value} WHERE user_id = %s AND chat_id = %s) THEN 1 ELSE 0 END AS IsAdmin',
+                               params = (user_id, chat_id_param(chat_id)))
+                return cursor.fetchone()
 
-        cursor = self.get_cursor()
-        cursor.execute(f'SELECT CASE WHEN EXISTS(SELECT user_name FROM ChatAdmins WHERE user_id = {user_id} AND chat_id = {chat_id}) THEN 1 ELSE 0 END AS IsEmpty')
-        member_in_table_flag = cursor.fetchone()
-        if member_in_table_flag:
-            return True
-            
-        return False
+        member_in_table_flag = await self.run_sync(select_is_admin)
+        is_admin = member_in_table_flag[0] == 1 #query always returns one row: (1,) or (0,)
+        admin_permissions.put(chat_id, user_id, is_admin)
+        return is_admin
 
 
-    def set_new_admin(self, user_id: int, user_name: str, chat_id: int):
-        self.insert('ChatAdmins', {'user_id' : user_id, 'user_name' : user_name, 'chat_id' : chat_id}, ignore = True)
+    async def set_new_admin(self, user_id: int, user_name: str, chat_id: int):
+        await self.insert(Tables.ChatAdmins.value, {'user_id' : user_id, 'user_name' : user_name, 'chat_id' : chat_id}, ignore = True)
+        admin_permissions.invalidate(chat_id, user_id)
 
 
-    def remove_admin(self, user_id: int, chat_id: int):
-        self.delete('ChatAdmins', f'WHERE user_id = {user_id} AND chat_id = {chat_id}', ignore = True)
+    async def remove_admin(self, user_id: int, chat_id: int):
+        await self.delete(Tables.ChatAdmins.value, 'WHERE user_id = %s AND chat_id = %s', ignore = True,
+                          params = (user_id, chat_id_param(chat_id)))
+        admin_permissions.invalidate(chat_id, user_id)
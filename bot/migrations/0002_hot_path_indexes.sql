@@ -0,0 +1,12 @@
+-- Chats: clan of the chat is looked up by each command.
+CREATE INDEX ix_chats_chat_id ON Chats (chat_id, clan_tag);
+-- ClanMembers, RadeMembers, ClanWarLeague_memberlist: memberlists are selected and replaced by clan.
+CREATE INDEX ix_clanMembers_clan_tag ON ClanMembers (clan_tag, member_tag);
+CREATE INDEX ix_radeMembers_clan_tag ON RadeMembers (clan_tag);
+CREATE INDEX ix_CWL_memberlist_clan_tag ON ClanWarLeague_memberlist (clan_tag);
+-- ClanWarLeague_results: covering index of the leaderboard (SELECT * ... WHERE clan_tag = %s ORDER BY avg_score DESC).
+CREATE INDEX ix_CWL_results_leaderboard ON ClanWarLeague_results (clan_tag, avg_score DESC, member_name, member_tag, stars, attacks);
+-- ChatAdmins: admin rights are checked by user and chat.
+CREATE INDEX ix_chatAdmins_user_chat ON ChatAdmins (user_id, chat_id);
+-- ChatUsers_nicknames: nickname is selected by chat and user.
+CREATE INDEX ix_nicknames_chat_user ON ChatUsers_nicknames (chat_id, user_id, user_nickname);
@@ -0,0 +1,2 @@
+-- ClanWarLeague_wars: CWL wars already seen by results ingestion, with the side played by the clan (NULL - war of other clans).
+CREATE TABLE IF NOT EXISTS ClanWarLeague_wars (war_tag varchar(12), clan_tag varchar(12), clan_side varchar(8), state varchar(15), CONSTRAINT pk_CWL_wars UNIQUE (clan_tag, war_tag));
@@ -0,0 +1,8 @@
+-- ClanWarLeague_results: sums and averages per attack of the destruction and three-star attacks, rows of the previous seasons keep 0.
+ALTER TABLE ClanWarLeague_results ADD COLUMN destruction DECIMAL(6,2) DEFAULT 0;
+ALTER TABLE ClanWarLeague_results ADD COLUMN avg_destruction DECIMAL(5,2) DEFAULT 0;
+ALTER TABLE ClanWarLeague_results ADD COLUMN three_stars TINYINT UNSIGNED DEFAULT 0;
+ALTER TABLE ClanWarLeague_results ADD COLUMN three_star_rate DECIMAL(4,3) DEFAULT 0;
+-- covering index of the leaderboard is rebuilt with the new columns.
+DROP INDEX ix_CWL_results_leaderboard ON ClanWarLeague_results;
+CREATE INDEX ix_CWL_results_leaderboard ON ClanWarLeague_results (clan_tag, avg_score DESC, member_name, member_tag, stars, attacks, avg_destruction, three_star_rate);
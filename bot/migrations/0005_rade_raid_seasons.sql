@@ -0,0 +1,5 @@
+-- RadeMembers: results of the member in the last raid weekend of the clan (`capitalraidseasons`), NULL - not polled yet.
+ALTER TABLE RadeMembers ADD COLUMN raid_season varchar(20);
+ALTER TABLE RadeMembers ADD COLUMN raid_looted INT;
+ALTER TABLE RadeMembers ADD COLUMN raid_attacks TINYINT UNSIGNED;
+ALTER TABLE RadeMembers ADD COLUMN raid_attack_limit TINYINT UNSIGNED;
@@ -0,0 +1,2 @@
+-- ChatAdmins: UNIQUE (user_id) already serves lookups by user and chat, the index of 0002 only slowed down writes.
+DROP INDEX ix_chatAdmins_user_chat ON ChatAdmins;
@@ -0,0 +1,2 @@
+-- ClanWarLeague_results: destruction is summed over all seasons of the member and outgrows DECIMAL(6,2) (9999.99%).
+ALTER TABLE ClanWarLeague_results MODIFY COLUMN destruction DECIMAL(10,2) DEFAULT 0;
@@ -1,6 +1,20 @@
+database_engine = 'mysql' #'mysql' - MySQL server configured below, 'sqlite' - embedded DB file `sqlite_config_path`
+
 mysql_config_host = 'HOST'
 mysql_config_port = 'PORT' #int
 mysql_config_user = 'USER_NAME'
 mysql_config_password = "PASSWORD"
 mysql_config_db_name = 'CoC_Helper'
 mysql_config_charset = 'utf8'
+
+mysql_config_pool_size = 5 #max number of the opened connections to the mysql server
+mysql_config_pool_timeout = 10 #seconds to wait for a free connection of the pool
+mysql_config_pool_health_check_after = 30 #seconds of idle time, after which connection is pinged before use
+mysql_config_statement_cache_size = 128 #max number of the built SQL statements kept for reuse
+mysql_config_prepared_statements = True #execute writes by server-side prepared statements, kept opened on each connection of the pool
+mysql_config_read_host = None #host of the read replica for selects, None - selects go to the primary server
+mysql_config_read_port = None #int, None - the same port as the primary server
+
+sqlite_config_path = 'CoC_Helper.sqlite3' #DB file of the 'sqlite' engine
+sqlite_config_busy_timeout = 30 #seconds to wait for the lock of the DB file held by another writer
+sqlite_config_read_path = None #DB file for selects (a replica of `sqlite_config_path`), None - selects go to `sqlite_config_path`
@@ -0,0 +1,199 @@
+'''Thread-safe pool of connections to the MySQL server, used by `storage.MySQLBackend`.
+
+Classes:
+
+    ConnectionPool'''
+
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from mysql.connector import errors
+from mysql.connector.connection import MySQLConnection
+from mysql.connector.cursor import MySQLCursorPrepared
+
+
+class ConnectionPool():
+    '''Thread-safe pool of `mysql.connector.connection.MySQLConnection`.
+
+    Connections are opened lazily up to `size`, each operation checks out its own connection and returns it back.
+    Connection, that was idle longer than `health_check_after` seconds, is pinged and reconnected if it was dropped;
+    connection, that failed with an interface or operational error, is closed instead of returning to the pool.
+    Connection is rolled back before returning to the pool, so the next checkout doesn't read the snapshot of the previous one
+    (writes are committed by the caller before).
+
+    Server-side prepared statements live as long as their connection, so the pool keeps prepared cursors of each connection
+    and forgets them when the connection is reconnected or closed.
+
+    :parameter `size`: max number of the opened connections
+    :parameter `timeout`: seconds to wait for a free connection before raising `mysql.connector.errors.PoolError`
+    :parameter `health_check_after`: seconds of idle time, after which connection is checked before use
+    :parameter `prepared_per_connection`: max number of the prepared statements kept opened on each connection
+    :parameter `connection_config`: arguments of `mysql.connector.connection.MySQLConnection`'''
+
+    def __init__(self, size: int, timeout: float, health_check_after: float, prepared_per_connection: int = 32, **connection_config):
+        self.size = size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self.prepared_per_connection = prepared_per_connection
+        self.connection_config = connection_config
+        self._idle: list[tuple[MySQLConnection, float]] = [] #stack: the most recently used connection is checked out first
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock) #notified when connection is returned or closed
+        self._prepared: weakref.WeakKeyDictionary[MySQLConnection, OrderedDict] = weakref.WeakKeyDictionary()
+
+        self.checkouts = 0
+        self.reconnects = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+
+    @property
+    def average_wait_seconds(self) -> float:
+        '''Average time spent waiting for a free connection.'''
+
+        if not self.checkouts:
+            return 0.0
+        return self.wait_seconds_total / self.checkouts
+
+
+    @contextmanager
+    def connection(self):
+        '''Checks out connection from the pool for the `with` block and returns it back after.'''
+
+        conn = self._checkout()
+        try:
+            yield conn
+
+        except (errors.InterfaceError, errors.OperationalError):
+            self._discard(conn)
+            raise
+
+        except BaseException:
+            self._release(conn)
+            raise
+
+        else:
+            self._release(conn)
+
+
+    def prepared_cursor(self, conn: MySQLConnection, statement: str) -> MySQLCursorPrepared:
+        '''Returns prepared cursor of the checked out connection for the statement.
+
+        Statement is prepared on the server by the first execution of the cursor, next executions only send parameters.
+        The least recently used cursor is closed, if the connection has more than `prepared_per_connection` of them.'''
+
+        with self._lock:
+            cursors = self._prepared.setdefault(conn, OrderedDict())
+
+        cursor = cursors.pop(statement, None)
+        if cursor is None:
+            cursor = MySQLCursorPrepared(conn)
+            if len(cursors) >= self.prepared_per_connection:
+                _, least_used = cursors.popitem(last = False)
+                least_used.close()
+
+        cursors[statement] = cursor
+        return cursor
+
+
+    def close(self):
+        '''Closes idle connections of the pool.'''
+
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+    def _checkout(self) -> MySQLConnection:
+        '''Takes idle connection or opens new one if the pool isn't full,
+        else waits until connection is returned or closed by another thread and tries again.'''
+
+        started_at = time.monotonic()
+        with self._available:
+            while not self._idle and self._opened >= self.size:
+                remaining = started_at + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    raise errors.PoolError(f'No free connection in the pool for {self.timeout} seconds')
+                self._available.wait(remaining)
+
+            if self._idle:
+                conn, idle_since = self._idle.pop()
+            else:
+                conn = None
+                self._opened += 1
+
+        if conn is None:
+            conn = self._open_connection()
+            idle_since = time.monotonic()
+
+        waited = time.monotonic() - started_at
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        if time.monotonic() - idle_since > self.health_check_after:
+            self._ensure_connected(conn)
+        return conn
+
+
+    def _open_connection(self) -> MySQLConnection:
+        '''Opens new connection in the place reserved by `_checkout`, frees the place if the connection failed.'''
+
+        try:
+            return MySQLConnection(**self.connection_config)
+        except BaseException:
+            with self._available:
+                self._opened -= 1
+                self._available.notify()
+            raise
+
+
+    def _ensure_connected(self, conn: MySQLConnection):
+        '''Pings connection, reconnects it if it was dropped by the server.'''
+
+        try:
+            conn.ping()
+        except errors.InterfaceError:
+            logging.warning('MySQL connection was dropped, reconnecting...')
+            try:
+                conn.reconnect(attempts = 3, delay = 1)
+            except BaseException:
+                self._discard(conn)
+                raise
+            with self._lock:
+                self.reconnects += 1
+                self._prepared.pop(conn, None) #statements prepared by the old session don't exist anymore
+
+
+    def _discard(self, conn: MySQLConnection):
+        try:
+            conn.close()
+        except errors.Error:
+            pass
+        with self._available:
+            self._opened -= 1
+            self._prepared.pop(conn, None)
+            self._available.notify()
+
+
+    def _release(self, conn: MySQLConnection):
+        '''Ends the opened transaction of the connection (and its REPEATABLE READ snapshot) and returns the connection to the pool,
+        closes it if rollback failed.'''
+
+        try:
+            conn.rollback()
+        except errors.Error:
+            logging.exception('Rollback of the MySQL connection failed')
+            self._discard(conn)
+            return
+
+        with self._available:
+            self._idle.append((conn, time.monotonic()))
+            self._available.notify()
@@ -0,0 +1,214 @@
+'''Schedules polling requests to the CoC API inside the event loop of the dispatcher.
+
+Classes:
+
+    ClanStates
+    PollScheduler
+
+Objects:
+
+    clan_states - shared `ClanStates` instance, filled by handlers and pollings of the module `handle_clan_data.py`
+'''
+
+
+import asyncio
+import heapq
+import logging
+import random
+import time
+from contextlib import suppress
+from typing import Awaitable, Callable
+
+from bot_config import DelayPollClanWarMemberlistAndRadeStatistic, PollIntervalsByWarState
+
+
+class ClanStates:
+    '''Keeps the last seen CW and CWL state of each clan and defines polling interval of the clan by them.
+
+    :parameter `intervals_by_state`: seconds between pollings of the clan in each CW/CWL state
+    :parameter `default_interval`: seconds between pollings of the clan, which states are unknown or absent in `intervals_by_state`'''
+
+    def __init__(self, intervals_by_state: dict, default_interval: float):
+        self.intervals_by_state = intervals_by_state
+        self.default_interval = default_interval
+        self._war_states: dict[str, str] = {}
+        self._cwl_states: dict[str, str] = {}
+        self._subscribers: list[Callable[[str], None]] = []
+
+
+    def subscribe(self, callback: Callable[[str], None]):
+        '''Takes function, that is called with clan tag every time when the state of this clan changes.'''
+
+        self._subscribers.append(callback)
+
+
+    def observe_war(self, clan_tag: str, state: str | None):
+        '''Saves state of the current CW of the clan (`state` field of the API response).'''
+
+        self._observe(self._war_states, clan_tag, state)
+
+
+    def observe_cwl(self, clan_tag: str, state: str | None):
+        '''Saves state of the current CWL of the clan (`state` field of the API response).'''
+
+        self._observe(self._cwl_states, clan_tag, state)
+
+
+    def _observe(self, states: dict, clan_tag: str, state: str | None):
+        if state is None or states.get(clan_tag) == state:
+            return
+
+        states[clan_tag] = state
+        for callback in self._subscribers:
+            callback(clan_tag)
+
+
+    def interval(self, clan_tag: str) -> float:
+        '''Returns polling interval of the clan: the shortest one among intervals of its CW and CWL states.'''
+
+        intervals = [self.intervals_by_state[state] for state in (self._war_states.get(clan_tag), self._cwl_states.get(clan_tag))
+                     if state in self.intervals_by_state]
+        return min(intervals, default = self.default_interval)
+
+
+class PollScheduler:
+    '''Polls every registered clan as a task of the running event loop.
+
+    Each clan has its own due time: clans are spread evenly across the delay and every poll is shifted by a random jitter,
+    so requests to the API and writes to the DB come smoothly instead of one burst per delay.
+    Due times are kept in a priority queue, list of the registered clans is refreshed once per delay.
+
+    Interval between pollings of the clan is taken from `states` (if passed), when the clan changes its state,
+    its next polling is moved closer if the new interval is shorter.
+
+    :parameter `poll_clan`: coroutine function, that takes clan tag and polls all its data
+    :parameter `get_clan_tags`: coroutine function, that returns tags of the registered clans
+    :parameter `delay_sec`: number of the seconds between pollings of the same clan, if `states` isn't passed
+    :parameter `jitter`: max random shift of the poll as a fraction of the clan polling interval
+    :parameter `states`: `ClanStates`, that defines polling interval of each clan
+    :parameter `on_refresh`: function, that is called after each refresh of the registered clans'''
+
+    def __init__(self, poll_clan: Callable[[str], Awaitable], get_clan_tags: Callable[[], Awaitable[list]], delay_sec: int,
+                 jitter: float = 0.0, states: ClanStates | None = None, on_refresh: Callable[[], None] | None = None):
+        self.poll_clan = poll_clan
+        self.get_clan_tags = get_clan_tags
+        self.delay_sec = delay_sec
+        self.jitter = jitter
+        self.states = states
+        self.on_refresh = on_refresh
+        self._task: asyncio.Task | None = None
+        self._schedule: list[tuple[float, str, float]] = [] #heap of (due time, clan tag, planned time without jitter)
+        self._planned: dict[str, float] = {}
+        self._last_polled: dict[str, float] = {}
+        self._next_refresh = 0.0
+        self._schedule_changed = asyncio.Event()
+
+        if states is not None:
+            states.subscribe(self._reschedule)
+
+
+    def start(self):
+        '''Starts scheduler task in the running event loop.'''
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name = 'PollScheduler')
+
+
+    async def stop(self):
+        '''Cancels scheduler task and waits until current polling is interrupted.'''
+
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+    async def _run(self):
+        while True:
+            if time.monotonic() >= self._next_refresh:
+                await self._refresh_clans()
+
+            due = self._schedule[0][0] if self._schedule else self._next_refresh
+            delay = min(due, self._next_refresh) - time.monotonic()
+            if delay > 0:
+                await self._sleep(delay)
+                continue
+
+            _, clan_tag, planned = heapq.heappop(self._schedule)
+            if self._planned.get(clan_tag) != planned: #clan was removed or rescheduled
+                continue
+
+            await self._poll(clan_tag)
+            self._last_polled[clan_tag] = time.monotonic()
+            self._plan(clan_tag, max(planned + self._interval(clan_tag), time.monotonic()))
+
+
+    async def _sleep(self, delay: float):
+        '''Sleeps for `delay` seconds or until a clan is rescheduled.'''
+
+        self._schedule_changed.clear()
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._schedule_changed.wait(), delay)
+
+
+    def _interval(self, clan_tag: str) -> float:
+        if self.states is None:
+            return self.delay_sec
+        return self.states.interval(clan_tag)
+
+
+    def _reschedule(self, clan_tag: str):
+        '''Moves the next polling of the clan closer, if its interval became shorter.'''
+
+        if clan_tag not in self._planned:
+            return
+
+        planned = max(self._last_polled.get(clan_tag, 0.0) + self._interval(clan_tag), time.monotonic())
+        if planned < self._planned[clan_tag]:
+            self._plan(clan_tag, planned)
+            self._schedule_changed.set()
+
+
+    async def _refresh_clans(self):
+        '''Syncs schedule with the registered clans: spreads new clans evenly across the delay, forgets removed ones.'''
+
+        try:
+            clan_tags = set(await self.get_clan_tags())
+        except Exception:
+            logging.exception('Refreshing of the registered clans failed')
+            self._next_refresh = time.monotonic() + self.delay_sec
+            return
+
+        for clan_tag in self._planned.keys() - clan_tags:
+            del self._planned[clan_tag]
+            self._last_polled.pop(clan_tag, None)
+
+        new_clan_tags = sorted(clan_tags - self._planned.keys())
+        now = time.monotonic()
+        for index, clan_tag in enumerate(new_clan_tags):
+            self._plan(clan_tag, now + self.delay_sec * index / len(new_clan_tags))
+
+        self._next_refresh = now + self.delay_sec
+        if self.on_refresh is not None:
+            self.on_refresh()
+
+
+    def _plan(self, clan_tag: str, planned: float):
+        '''Puts the next poll of the clan into the schedule with a random jitter.'''
+
+        self._planned[clan_tag] = planned
+        due = planned + random.uniform(0, self.jitter) * self._interval(clan_tag)
+        heapq.heappush(self._schedule, (due, clan_tag, planned))
+
+
+    async def _poll(self, clan_tag: str):
+        '''Polls clan, logs an error instead of stopping the scheduler if polling fails.'''
+
+        try:
+            await self.poll_clan(clan_tag)
+        except Exception:
+            logging.exception(f'Polling of the clan {clan_tag} failed')
+
+
+clan_states = ClanStates(PollIntervalsByWarState, DelayPollClanWarMemberlistAndRadeStatistic)
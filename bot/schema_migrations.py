@@ -0,0 +1,88 @@
+'''Applies versioned schema migrations to the DB.
+
+Migrations are SQL scripts of the directory `migrations`, named `<version>_<name>.sql` and applied in order of the versions.
+Applied versions are saved in the table `schema_migrations`, so each migration runs only once.
+
+Classes:
+
+    Migration(NamedTuple)
+
+Funcs:
+
+    load_migrations()
+    apply_migrations()'''
+
+import logging
+import os
+import re
+from typing import NamedTuple
+
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+
+class Migration(NamedTuple):
+    '''
+    :parameter `version`: number of the migration, defines the order of migrations
+    :parameter `name`: name of the migration script without version and extension
+    :parameter `statements`: SQL statements of the script, without comments
+    '''
+
+    version: int
+    name: str
+    statements: list[str]
+
+
+def load_migrations(migrations_dir: str = MIGRATIONS_DIR) -> list[Migration]:
+    '''Reads migration scripts from the directory, returns them sorted by version.'''
+
+    migrations = []
+    for file_name in os.listdir(migrations_dir):
+        matched = re.fullmatch(r'(\d+)_(\w+)\.sql', file_name)
+        if matched is None:
+            continue
+
+        with open(os.path.join(migrations_dir, file_name), 'r') as script:
+            sql_script = '\n'.join(line for line in script.read().splitlines() if not line.lstrip().startswith('--'))
+
+        statements = [statement.strip() for statement in sql_script.split(';') if statement.strip()]
+        migrations.append(Migration(int(matched.group(1)), matched.group(2), statements))
+
+    return sorted(migrations)
+
+
+def apply_migrations(backend, migrations: list[Migration] | None = None) -> list[Migration]:
+    '''Takes `storage.StorageBackend`, applies migrations, that aren't saved in the table `schema_migrations` yet.
+
+    Each migration is saved right after its statements, so a failed one is applied again by the next start.
+    MySQL commits each DDL statement implicitly, so statements of a migration, that failed on MySQL halfway,
+    stay applied: they must be reverted by hand before the next start, else the migration fails again (e.g. on a duplicate column).
+    Returns list of the applied migrations.'''
+
+    if migrations is None:
+        migrations = load_migrations()
+
+    with backend.connection() as conn:
+        return _apply_pending(conn, backend.cursor(conn), migrations)
+
+
+def _apply_pending(conn, cursor, migrations: list[Migration]) -> list[Migration]:
+    cursor.execute('CREATE TABLE IF NOT EXISTS schema_migrations (version INT PRIMARY KEY, name varchar(100), '
+                   'applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)')
+    cursor.execute('SELECT version FROM schema_migrations')
+    applied_versions = {row[0] for row in cursor.fetchall()}
+
+    applied = []
+    for migration in migrations:
+        if migration.version in applied_versions:
+            continue
+
+        logging.info(f'Applying schema migration {migration.version:04d}_{migration.name}')
+        for statement in migration.statements:
+            cursor.execute(statement)
+        cursor.execute('INSERT INTO schema_migrations (version, name) VALUES (%s, %s)', (migration.version, migration.name))
+        conn.commit()
+        applied.append(migration)
+
+    cursor.close()
+    return applied
@@ -0,0 +1,334 @@
+'''Storage backends under `database.DataBaseManipulations`.
+
+Queries of the bot are written in the MySQL dialect, each backend executes them on its own DB engine
+and raises errors of the module `errors.py` instead of the driver ones.
+
+Classes:
+
+    StorageBackend
+    MySQLBackend
+    SQLiteCursor
+    SQLiteBackend
+
+Funcs:
+
+    create_backend()'''
+
+import functools
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from errors import DataBaseError, DataBaseIntegrityError, DataBaseOperationalError, DataBaseProgrammingError
+
+
+class StorageBackend():
+    '''Interface of the DB engine.
+
+    Connection is checked out for the `with` block of `connection()`, statements are executed by cursors of `cursor()`
+    (rows of the select are buffered) and `write_cursor()`; commit is made by the caller with `conn.commit()`.
+    Big selects are streamed by `iter_rows()` without buffering.'''
+
+    name: str
+    max_params: int = 65535 #max number of the placeholders in one statement
+
+    #pairs of the driver error class and the error class of `errors.py`, the first matching pair is used
+    ERRORS: tuple[tuple[type, type], ...] = ()
+
+
+    @contextmanager
+    def connection(self):
+        '''Checks out connection for the `with` block and returns it back after.'''
+        raise NotImplementedError
+
+
+    def cursor(self, conn):
+        '''Returns buffered cursor of the checked out connection.'''
+        raise NotImplementedError
+
+
+    def write_cursor(self, conn, statement: str):
+        '''Returns cursor of the checked out connection for the write statement.'''
+
+        return self.cursor(conn)
+
+
+    def iter_rows(self, conn, statement: str, params: tuple | None, batch_size: int) -> Iterator[tuple]:
+        '''Executes select on the checked out connection by unbuffered cursor, yields its rows fetched by batches of `batch_size` rows.
+
+        Connection stays busy until the generator is exhausted or closed.'''
+        raise NotImplementedError
+
+
+    def create_database(self):
+        '''Creates the database, if it doesn't exist.'''
+        raise NotImplementedError
+
+
+    def close(self):
+        '''Closes all opened connections.'''
+
+
+    @contextmanager
+    def _translated_errors(self):
+        '''Raises errors of the driver inside the `with` block as errors of `errors.py`.'''
+
+        try:
+            yield
+
+        except DataBaseError:
+            raise
+
+        except Exception as error:
+            for driver_error, database_error in self.ERRORS:
+                if isinstance(error, driver_error):
+                    raise database_error(str(error)) from error
+            raise
+
+
+class MySQLBackend(StorageBackend):
+    '''MySQL server, connections are checked out from `mysql_pool.ConnectionPool`.
+
+    :parameter `pool_size`, `pool_timeout`, `health_check_after`: parameters of `ConnectionPool`
+    :parameter `prepared_statements`: execute writes by server-side prepared statements, kept opened on each connection
+    :parameter `connection_config`: arguments of `mysql.connector.connection.MySQLConnection`'''
+
+    name = 'mysql'
+
+    def __init__(self, pool_size: int, pool_timeout: float, health_check_after: float, prepared_statements: bool = True,
+                 **connection_config):
+        from mysql.connector import errors #imported here, so the bot runs on SQLite without mysql-connector installed
+        from mysql.connector.cursor import MySQLCursor, MySQLCursorBuffered
+        from mysql_pool import ConnectionPool
+
+        self.ERRORS = (
+                       (errors.IntegrityError, DataBaseIntegrityError),
+                       (errors.ProgrammingError, DataBaseProgrammingError),
+                       (errors.InterfaceError, DataBaseOperationalError),
+                       (errors.OperationalError, DataBaseOperationalError),
+                       (errors.PoolError, DataBaseOperationalError),
+                       (errors.Error, DataBaseError),
+                      )
+        self._cursor_class = MySQLCursorBuffered
+        self._stream_cursor_class = MySQLCursor
+        self.prepared_statements = prepared_statements
+        self.pool = ConnectionPool(pool_size, pool_timeout, health_check_after, **connection_config)
+
+
+    @contextmanager
+    def connection(self):
+        with self._translated_errors(), self.pool.connection() as conn:
+            yield conn
+
+
+    def cursor(self, conn):
+        return self._cursor_class(conn)
+
+
+    def iter_rows(self, conn, statement: str, params: tuple | None, batch_size: int) -> Iterator[tuple]:
+        '''Rows are read from the server by `MySQLCursor` while they are fetched, not at once by the execution.'''
+
+        cursor = self._stream_cursor_class(conn)
+        try:
+            with self._translated_errors():
+                cursor.execute(statement, params)
+                while rows := cursor.fetchmany(batch_size):
+                    yield from rows
+        finally:
+            if conn.unread_result: #generator was closed before the end of the result set
+                conn.consume_results()
+            cursor.close()
+
+
+    def close(self):
+        self.pool.close()
+
+
+    def write_cursor(self, conn, statement: str):
+        '''Returns prepared cursor of the pool if `prepared_statements` is on, else buffered cursor.'''
+
+        if self.prepared_statements:
+            return self.pool.prepared_cursor(conn, statement)
+        return self.cursor(conn)
+
+
+    def create_database(self):
+        '''Requests test SQL query, creates the database by a separate connection without selected database,
+        if connection of the pool can't select it.'''
+
+        from mysql.connector.connection import MySQLConnection
+
+        try:
+            with self.connection() as conn:
+                self.cursor(conn).execute('SELECT 1')
+            return
+        except DataBaseProgrammingError:
+            pass
+
+        bootstrap_config = {key: value for key, value in self.pool.connection_config.items() if key != 'database'}
+        with self._translated_errors():
+            conn = MySQLConnection(**bootstrap_config)
+            try:
+                cursor = self.cursor(conn)
+                cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.pool.connection_config['database']}")
+                conn.commit()
+                cursor.close()
+            finally:
+                conn.close()
+
+
+class SQLiteCursor():
+    '''Cursor of `sqlite3`, that takes statements in the MySQL dialect of the bot and buffers rows of the select.
+
+    Only constructions used by the bot are translated: `%s` placeholders, `INSERT IGNORE`, `DELETE IGNORE`,
+    `ON DUPLICATE KEY UPDATE` with `VALUES(column)`, `IF()`, `DROP INDEX ... ON table` and `ALTER TABLE ... MODIFY COLUMN` (skipped).'''
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._cursor = conn.cursor()
+        self._rows: list = []
+        self.rowcount = -1
+
+
+    def execute(self, operation: str, params: tuple | None = None, multi: bool = False):
+        self._cursor.execute(_translate_to_sqlite(operation), params or ())
+        self._rows = self._cursor.fetchall() if self._cursor.description is not None else []
+        self._rows.reverse() #rows are popped from the end
+        self.rowcount = self._cursor.rowcount
+
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+
+    def fetchone(self) -> tuple | None:
+        return self._rows.pop() if self._rows else None
+
+
+    def fetchmany(self, size: int = 1) -> list:
+        rows = self._rows[:-size - 1:-1]
+        del self._rows[-size:]
+        return rows
+
+
+    def fetchall(self) -> list:
+        rows = self._rows[::-1]
+        self._rows = []
+        return rows
+
+
+    def close(self):
+        self._cursor.close()
+
+
+@functools.lru_cache(maxsize = 256)
+def _translate_to_sqlite(statement: str) -> str:
+    '''Returns the statement of the MySQL dialect rewritten for SQLite.'''
+
+    statement = statement.replace('%s', '?')
+    statement = re.sub(r'^\s*INSERT\s+IGNORE\b', 'INSERT OR IGNORE', statement, flags = re.IGNORECASE)
+    statement = re.sub(r'^\s*DELETE\s+IGNORE\b', 'DELETE', statement, flags = re.IGNORECASE)
+    statement = re.sub(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', 'ON CONFLICT DO UPDATE SET', statement, flags = re.IGNORECASE)
+    statement = re.sub(r'\bVALUES\((\w+)\)', r'excluded.\1', statement, flags = re.IGNORECASE)
+    statement = re.sub(r'\bIF\(', 'IIF(', statement, flags = re.IGNORECASE)
+    statement = re.sub(r'^\s*DROP\s+INDEX\s+(\w+)\s+ON\s+\w+', r'DROP INDEX \1', statement, flags = re.IGNORECASE)
+    statement = re.sub(r'^\s*ALTER\s+TABLE\s+\w+\s+MODIFY\s+COLUMN\b.*', 'SELECT 1', statement, flags = re.IGNORECASE | re.DOTALL) #SQLite ignores sizes of the types
+    return statement
+
+
+class SQLiteBackend(StorageBackend):
+    '''Embedded SQLite database in the WAL mode: readers don't block the writer and each other.
+
+    Each thread of the executor keeps its own connection to the DB file, writers wait for each other up to `busy_timeout`.
+
+    :parameter `path`: path of the DB file
+    :parameter `busy_timeout`: seconds to wait for the lock of the DB held by another writer'''
+
+    name = 'sqlite'
+    max_params = 32766
+
+    ERRORS = (
+              (sqlite3.IntegrityError, DataBaseIntegrityError),
+              (sqlite3.ProgrammingError, DataBaseProgrammingError),
+              (sqlite3.OperationalError, DataBaseOperationalError),
+              (sqlite3.Error, DataBaseError),
+             )
+
+    def __init__(self, path: str, busy_timeout: float = 30):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+
+    @contextmanager
+    def connection(self):
+        with self._translated_errors():
+            conn = self._thread_connection()
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout = self.busy_timeout, check_same_thread = False)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL') #WAL keeps the DB consistent, only the last commits can be lost by power failure
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+
+    def cursor(self, conn: sqlite3.Connection) -> SQLiteCursor:
+        return SQLiteCursor(conn)
+
+
+    def iter_rows(self, conn: sqlite3.Connection, statement: str, params: tuple | None, batch_size: int) -> Iterator[tuple]:
+        '''Rows are stepped by `sqlite3` cursor while they are fetched.'''
+
+        cursor = conn.cursor()
+        try:
+            with self._translated_errors():
+                cursor.execute(_translate_to_sqlite(statement), params or ())
+                while rows := cursor.fetchmany(batch_size):
+                    yield from rows
+        finally:
+            cursor.close()
+
+
+    def create_database(self):
+        '''DB file is created by the first connection.'''
+
+        with self.connection():
+            pass
+
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def create_backend(engine: str, **config) -> StorageBackend:
+    '''Returns backend of the DB engine: `mysql` or `sqlite`, configured by `config`.'''
+
+    match engine:
+
+        case 'mysql':
+            return MySQLBackend(**config)
+
+        case 'sqlite':
+            return SQLiteBackend(**config)
+
+        case _:
+            raise ValueError(f'Unknown database engine: {engine}')
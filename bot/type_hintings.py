@@ -3,12 +3,13 @@
 Classes:
 
     Response(NamedTuple)
+    RequestPriority(Enum)
     ClanWarLeagueMembersInfo(NamedTuple)
-    ClanWarLeagueMembersAttacksResul(NamedTuple)
     ClanWarMembersInfo(NamedTuple)
     ClanMembersInfo(NamedTuple)
-    DateTime(NamedTuple)'''
+    WarTimeline(NamedTuple)'''
 
+from datetime import datetime
 from typing import NamedTuple, Generator
 from enum import Enum
 
@@ -18,6 +19,17 @@ class Response(NamedTuple):
     status_code: int
     json_api_response_info: dict
 
+class RequestPriority(Enum):
+    '''
+    Priority lanes of the requests to the CoC API, lower value is served first.
+
+    :parameter `interactive`: requests made while answering to the user in chat
+    :parameter `background`: requests made by pollings
+    '''
+
+    interactive = 0
+    background = 1
+
 class Tables(Enum):
     '''
     Storing the names of all tables in DB.
@@ -26,16 +38,20 @@ class Tables(Enum):
     :parameter `ClanMembers`: table name `ClanMembers`
     :parameter `RadeMembers`: table name `RadeMembers`
     :parameter `ChatMembers`: table name `ChatMembers`
+    :parameter `ChatAdmins`: table name `ChatAdmins`
     :parameter `CWL_members`: table name `ClanWarLeague_memberlist`
     :parameter `CWL_results`: table name `ClanWarLeague_results`
+    :parameter `CWL_wars`: table name `ClanWarLeague_wars`
     '''
 
     Chats = 'Chats'
     ClanMembers = 'ClanMembers'
     RadeMembers = 'RadeMembers'
     ChatMembers = 'ChatMembers'
+    ChatAdmins = 'ChatAdmins'
     CWL_members = 'ClanWarLeague_memberlist'
     CWL_results = 'ClanWarLeague_results'
+    CWL_wars = 'ClanWarLeague_wars'
     UsersNames = 'ChatUsers_nicknames'
 
 class SelectQuery(NamedTuple):
@@ -62,14 +78,6 @@ class ClanWarLeagueMembersInfo(NamedTuple):
     members_townHallLevel: Generator
 
 
-class ClanWarLeagueMembersAttacksResult(NamedTuple):
-
-
-    members_names: Generator
-    members_tags: Generator
-    members_stars: Generator
-
-
 class ClanWarMembersInfo(NamedTuple):
 
 
@@ -86,12 +94,15 @@ class ClanMembersInfo(NamedTuple):
     members_roles: list
 
 
-class DateTime(NamedTuple):
+class WarTimeline(NamedTuple):
+    '''
+    Schedule of the CW or CWL round, times are in UTC.
 
+    :parameter `preparation_start`: start of the preparation day
+    :parameter `start`: start of the battle day
+    :parameter `end`: end of the war
+    '''
 
-    year: str
-    month: str
-    day: str
-    hour: str
-    minute: str
-    seconds: str
\ No newline at end of file
+    preparation_start: datetime
+    start: datetime
+    end: datetime
\ No newline at end of file